@@ -0,0 +1,29 @@
+"""Add composite index for the title queue position count
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_title_requests_kingdom_status_id',
+        'title_requests',
+        ['kingdom_id', 'status', 'id'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_title_requests_kingdom_status_id', table_name='title_requests')
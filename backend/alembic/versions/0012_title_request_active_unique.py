@@ -0,0 +1,71 @@
+"""Enforce one active title request per requester with partial unique indexes
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+ACTIVE = "status IN ('pending', 'assigned')"
+
+
+def upgrade():
+    # Cancel duplicates that slipped past the old SELECT-then-INSERT check,
+    # keeping the oldest active request of each group.
+    op.execute(f"""
+        UPDATE title_requests SET status = 'cancelled'
+        WHERE governor_id > 0 AND {ACTIVE}
+          AND EXISTS (
+            SELECT 1 FROM title_requests t2
+            WHERE t2.kingdom_id = title_requests.kingdom_id
+              AND t2.title_type = title_requests.title_type
+              AND t2.governor_id = title_requests.governor_id
+              AND t2.status IN ('pending', 'assigned')
+              AND t2.id < title_requests.id
+          )
+    """)
+    op.execute(f"""
+        UPDATE title_requests SET status = 'cancelled'
+        WHERE governor_id = 0 AND {ACTIVE}
+          AND EXISTS (
+            SELECT 1 FROM title_requests t2
+            WHERE t2.kingdom_id = title_requests.kingdom_id
+              AND t2.title_type = title_requests.title_type
+              AND t2.governor_id = 0
+              AND lower(t2.governor_name) = lower(title_requests.governor_name)
+              AND t2.status IN ('pending', 'assigned')
+              AND t2.id < title_requests.id
+          )
+    """)
+
+    op.create_index(
+        'uq_title_requests_active_governor',
+        'title_requests',
+        ['kingdom_id', 'title_type', 'governor_id'],
+        unique=True,
+        postgresql_where=sa.text(f"governor_id > 0 AND {ACTIVE}"),
+        sqlite_where=sa.text(f"governor_id > 0 AND {ACTIVE}"),
+    )
+    op.create_index(
+        'uq_title_requests_active_name',
+        'title_requests',
+        ['kingdom_id', 'title_type', sa.text('lower(governor_name)')],
+        unique=True,
+        postgresql_where=sa.text(f"governor_id = 0 AND {ACTIVE}"),
+        sqlite_where=sa.text(f"governor_id = 0 AND {ACTIVE}"),
+    )
+
+
+def downgrade():
+    op.drop_index('uq_title_requests_active_name', table_name='title_requests')
+    op.drop_index('uq_title_requests_active_governor', table_name='title_requests')
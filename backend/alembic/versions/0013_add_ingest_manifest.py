@@ -0,0 +1,34 @@
+"""Add ingest_manifest table for scan file hashes
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ingest_manifest',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('ingested_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('filename', 'sha256', name='uq_ingest_manifest_file'),
+    )
+    op.create_index('ix_ingest_manifest_id', 'ingest_manifest', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_ingest_manifest_id', table_name='ingest_manifest')
+    op.drop_table('ingest_manifest')
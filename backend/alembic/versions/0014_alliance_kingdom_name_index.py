@@ -0,0 +1,29 @@
+"""Add (kingdom_id, name) index on alliances
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_alliances_kingdom_name',
+        'alliances',
+        ['kingdom_id', 'name'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_alliances_kingdom_name', table_name='alliances')
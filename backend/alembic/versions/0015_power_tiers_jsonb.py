@@ -0,0 +1,52 @@
+"""Store dkp_rules.power_tiers as JSONB on PostgreSQL
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-17
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0015'
+down_revision = '0014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The old column was free text decoded with a fallback to None; the JSON type
+    # decodes on read and would fail on '' or malformed values, so clear those first
+    conn = op.get_bind()
+    dkp_rules = sa.table('dkp_rules', sa.column('id', sa.Integer), sa.column('power_tiers', sa.Text))
+    invalid = []
+    for rule_id, power_tiers in conn.execute(
+        sa.select(dkp_rules.c.id, dkp_rules.c.power_tiers).where(dkp_rules.c.power_tiers.isnot(None))
+    ):
+        try:
+            json.loads(power_tiers)
+        except ValueError:
+            invalid.append(rule_id)
+    if invalid:
+        conn.execute(dkp_rules.update().where(dkp_rules.c.id.in_(invalid)).values(power_tiers=None))
+
+    # SQLite keeps JSON as text, so the remaining JSON strings are already valid values
+    if conn.dialect.name != 'postgresql':
+        return
+    op.execute(
+        "ALTER TABLE dkp_rules ALTER COLUMN power_tiers TYPE JSONB "
+        "USING power_tiers::jsonb"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(
+        "ALTER TABLE dkp_rules ALTER COLUMN power_tiers TYPE VARCHAR(4000) "
+        "USING power_tiers::text"
+    )
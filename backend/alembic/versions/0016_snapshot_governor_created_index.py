@@ -0,0 +1,66 @@
+"""Index governor_snapshots by (governor_id_fk, created_at DESC) and ingest_file_id
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0016'
+down_revision = '0015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CONCURRENTLY on PostgreSQL so ingests aren't blocked while a large table is indexed;
+    # it can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_governor_snapshots_governor_created',
+            'governor_snapshots',
+            ['governor_id_fk', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_governor_snapshots_ingest_file_id',
+            'governor_snapshots',
+            ['ingest_file_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # Only databases created by create_all have the standalone created_at index;
+        # the composite index above serves the per-governor queries that used it
+        op.drop_index(
+            'ix_governor_snapshots_created_at',
+            table_name='governor_snapshots',
+            if_exists=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_governor_snapshots_created_at',
+            'governor_snapshots',
+            ['created_at'],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_governor_snapshots_ingest_file_id',
+            table_name='governor_snapshots',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_governor_snapshots_governor_created',
+            table_name='governor_snapshots',
+            postgresql_concurrently=True,
+        )
@@ -83,6 +83,16 @@ def require_kingdom_auth(
     return kingdom
 
 
+def require_path_kingdom_access(
+    kingdom_number: int,
+    current_kingdom: int = Depends(require_kingdom_auth),
+) -> int:
+    """Require authentication for the {kingdom_number} in the request path (403 otherwise)."""
+    if current_kingdom != kingdom_number:
+        raise HTTPException(status_code=403, detail="Access denied to this kingdom")
+    return current_kingdom
+
+
 def require_kingdom_access(kingdom_number: int):
     """Dependency that checks if the user has access to a specific kingdom."""
     def checker(current_kingdom: int = Depends(require_kingdom_auth)) -> int:
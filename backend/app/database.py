@@ -6,7 +6,10 @@ raw_db_url = os.getenv("DATABASE_URL", "").strip()
 DATABASE_URL = raw_db_url or "sqlite:///./rokstats.db"
 
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+# Compiled SQL kept per engine; the default of 500 statements is easily filled by
+# the API plus the ingest/bot paths
+QUERY_CACHE_SIZE = int(os.getenv("SQL_QUERY_CACHE_SIZE", "1200"))
+engine = create_engine(DATABASE_URL, connect_args=connect_args, query_cache_size=QUERY_CACHE_SIZE)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
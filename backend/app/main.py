@@ -1,23 +1,42 @@
 import os
+import asyncio
+import csv
+import gzip
+import io
 import json
 import hashlib
 import time
 import logging
+import random
 import re
+import secrets
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple, Deque, Literal
 
 logger = logging.getLogger(__name__)
 
-from fastapi import FastAPI, Depends, HTTPException, Header, Body, Request
+from fastapi import FastAPI, Depends, HTTPException, Header, Body, Request, Response, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import text, func
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import text, func, and_, or_, any_, case, bindparam, insert, select, update, BigInteger
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import orjson
+import pandas as pd
 from redis import Redis
+from redis import asyncio as aioredis
 from rq import Queue
 
 from .database import Base, engine, get_db, SessionLocal
-from .models import Kingdom, Alliance, Governor, GovernorSnapshot, IngestFile, DKPRule, AdminUser, TitleRequest, PlayerBan, TitleBotSettings, GovernorNameHistory
+from .models import Kingdom, Alliance, Governor, GovernorSnapshot, IngestFile, IngestManifest, DKPRule, AdminUser, TitleRequest, PlayerBan, TitleBotSettings, GovernorNameHistory, LinkedAccount, PlayerLocation
 from .schemas import (
     RokTrackerPayload, DKPConfig, LoginRequest, LoginResponse, KingdomSetup,
     AdminLoginRequest, AdminLoginResponse, AdminCreateKingdom, KingdomWithPassword,
@@ -26,12 +45,13 @@ from .schemas import (
 )
 from .auth import (
     hash_password, generate_password, create_token, verify_token,
-    get_current_kingdom, require_kingdom_auth
+    get_current_kingdom, require_kingdom_auth, require_path_kingdom_access
 )
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="RoK Stats Hub")
+# Responses (report lists, governor tables) are encoded with orjson instead of stdlib json
+app = FastAPI(title="RoK Stats Hub", default_response_class=ORJSONResponse)
 
 # CORS Configuration - restrict in production
 # Use environment variable CORS_ORIGINS to set allowed origins (comma-separated)
@@ -50,6 +70,12 @@ app.add_middleware(
 REDIS_URL = os.getenv("REDIS_URL")
 USE_ASYNC_INGEST = os.getenv("USE_ASYNC_INGEST", "0") == "1"
 
+# Internal/bot endpoint access (resolved once at startup)
+INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY", "rok-internal-import-key")
+BOT_API_KEY = os.getenv("BOT_API_KEY", INTERNAL_API_KEY)
+LOCAL_HOSTS = frozenset({"127.0.0.1", "localhost", "::1", "172.17.0.1"})  # inclui Docker host
+TITLE_BOT_ASSIGNED_STALE_SECONDS = int(os.getenv("TITLE_BOT_ASSIGNED_STALE_SECONDS", "180"))
+
 # Redis is optional - only create connections if URL is provided
 redis_client = None
 ingest_queue = None
@@ -91,6 +117,62 @@ def rate_limiter_strict(request: Request):
     _rate_bucket[key] = bucket
 
 
+def _dialect_insert(model):
+    """INSERT construct with ON CONFLICT support for the configured database (PostgreSQL or SQLite)."""
+    if engine.dialect.name == "postgresql":
+        return pg_insert(model)
+    return sqlite_insert(model)
+
+
+# kingdoms.id -> (parsed DKP rule as returned by get_dkp_rule, expires at);
+# set_dkp_rule evicts in this worker, the TTL bounds staleness in the others
+DKP_RULE_CACHE_TTL_SECONDS = 60
+_dkp_rule_cache: Dict[int, Tuple[Dict[str, Any], float]] = {}
+
+
+_KINGDOM_ID_BY_NUMBER = select(Kingdom.id).where(Kingdom.number == bindparam("number"))
+
+# kingdom number -> (kingdoms.id, generation it was read in). Deleting a kingdom
+# bumps the generation (in Redis when configured, so every API worker sees it) and
+# older entries stop counting; misses aren't cached, so new kingdoms need no bump
+_KINGDOM_GENERATION_KEY = "kingdoms:generation"
+_kingdom_generation = 0
+_kingdom_id_cache: Dict[int, Tuple[int, int]] = {}
+
+
+def _kingdom_cache_generation() -> int:
+    if redis_client is None:
+        return _kingdom_generation
+    return int(redis_client.get(_KINGDOM_GENERATION_KEY) or 0)
+
+
+def _invalidate_kingdom_ids() -> None:
+    """Call after committing a kingdom delete."""
+    global _kingdom_generation
+    _kingdom_generation += 1
+    _kingdom_id_cache.clear()
+    if redis_client is not None:
+        redis_client.incr(_KINGDOM_GENERATION_KEY)
+
+
+def _kingdom_id_for_number(db: Session, number: int) -> Optional[int]:
+    """Look up a kingdom's primary key by number, cached per process.
+
+    Only for sessions reading committed kingdoms: process_ingest, which may create
+    the kingdom in a transaction that later rolls back, queries directly.
+    """
+    generation = _kingdom_cache_generation()  # read first, so a concurrent delete invalidates this entry
+    cached = _kingdom_id_cache.get(number)
+    if cached is not None and cached[1] == generation:
+        return cached[0]
+    kingdom_id = db.execute(_KINGDOM_ID_BY_NUMBER, {"number": number}).scalar()
+    if kingdom_id is not None:
+        _kingdom_id_cache[number] = (kingdom_id, generation)
+    else:
+        _kingdom_id_cache.pop(number, None)
+    return kingdom_id
+
+
 def compute_ingest_hash(payload: RokTrackerPayload) -> str:
     if payload.ingest_hash:
         return payload.ingest_hash
@@ -117,23 +199,110 @@ def get_dkp_weights(db: Session, kingdom: Kingdom):
     return (float(rule.weight_t4), float(rule.weight_t5), float(rule.weight_dead))  # type: ignore[arg-type]
 
 
-def process_ingest(db: Session, payload: RokTrackerPayload, ingest_hash: str) -> int:
+# Rows per INSERT executemany when storing a scan; keeps statement size and
+# driver memory bounded on 10k+ record payloads
+INGEST_INSERT_BATCH_SIZE = 1000
+
+
+def _batched(rows: List[Dict[str, Any]], size: int = INGEST_INSERT_BATCH_SIZE):
+    """Yield successive lists of at most `size` rows."""
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+# On PostgreSQL, ingests with at least this many snapshots are written with COPY
+# (one streamed statement) instead of batched INSERTs; INGEST_USE_COPY=0 turns it off
+INGEST_USE_COPY = os.getenv("INGEST_USE_COPY", "1") == "1"
+SNAPSHOT_COPY_MIN_ROWS = 100
+_SNAPSHOT_COPY_COLUMNS = (
+    "governor_id_fk",
+    "ingest_file_id",
+    "created_at",
+    "power",
+    "kill_points",
+    "t1_kills",
+    "t2_kills",
+    "t3_kills",
+    "t4_kills",
+    "t5_kills",
+    "dead",
+    "rss_gathered",
+    "rss_assistance",
+    "helps",
+)
+
+
+def _copy_snapshots(db: Session, snapshot_rows: List[Dict[str, Any]]) -> None:
+    """COPY snapshot rows in through the session's own connection (same transaction)."""
+    created_at = datetime.utcnow()  # created_at has no server default
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in snapshot_rows:
+        writer.writerow([created_at if c == "created_at" else row[c] for c in _SNAPSHOT_COPY_COLUMNS])
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY governor_snapshots ({', '.join(_SNAPSHOT_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+# Lookups run for every ingest, built once so each call goes straight to the
+# compiled-statement cache
+_INGEST_ID_BY_HASH = (
+    select(IngestFile.id)
+    .where(IngestFile.ingest_hash == bindparam("ingest_hash"))
+    .limit(1)
+)
+_INGEST_ID_BY_SOURCE = (
+    select(IngestFile.id)
+    .where(
+        IngestFile.scan_type == bindparam("scan_type"),
+        IngestFile.source_file == bindparam("source_file"),
+    )
+    .limit(1)
+)
+
+
+def _governor_id_in(param: str):
+    """governors.governor_id matches any id in the list parameter `param`.
+
+    On PostgreSQL this is `= ANY(%(param)s)` with one array parameter, so the SQL
+    text is the same for every list size; elsewhere an expanding IN.
+    """
+    if engine.dialect.name == "postgresql":
+        return Governor.governor_id == any_(bindparam(param, type_=ARRAY(BigInteger)))
+    return Governor.governor_id.in_(bindparam(param, expanding=True))
+
+
+_GOVERNOR_NAMES_BY_ID = select(Governor.governor_id, Governor.name).where(_governor_id_in("governor_ids"))
+_GOVERNOR_STATE_BY_ID = select(
+    Governor.governor_id, Governor.id, Governor.name, Governor.alliance_id
+).where(_governor_id_in("governor_ids"))
+
+
+def process_ingest(db: Session, payload: RokTrackerPayload, ingest_hash: str, commit: bool = True) -> int:
+    """Store a scan payload. With commit=False the caller owns the transaction."""
     first_kingdom = payload.records[0].kingdom
-    kingdom = db.query(Kingdom).filter_by(number=first_kingdom).first()
-    if not kingdom:
+    kingdom_id = db.execute(_KINGDOM_ID_BY_NUMBER, {"number": first_kingdom}).scalar()
+    if kingdom_id is None:
         kingdom = Kingdom(number=first_kingdom)
         db.add(kingdom)
         db.flush()
+        kingdom_id = kingdom.id
 
     existing_ingest = None
     if ingest_hash:
-        existing_ingest = db.query(IngestFile).filter_by(ingest_hash=ingest_hash).first()
+        existing_ingest = db.execute(_INGEST_ID_BY_HASH, {"ingest_hash": ingest_hash}).scalar()
     if not existing_ingest:
-        existing_ingest = (
-            db.query(IngestFile)
-            .filter_by(scan_type=payload.scan_type, source_file=payload.source_file)
-            .first()
-        )
+        existing_ingest = db.execute(
+            _INGEST_ID_BY_SOURCE,
+            {"scan_type": payload.scan_type, "source_file": payload.source_file},
+        ).scalar()
     if existing_ingest:
         return 0
 
@@ -146,70 +315,110 @@ def process_ingest(db: Session, payload: RokTrackerPayload, ingest_hash: str) ->
     db.add(ingest_file)
     db.flush()
 
-    for r in payload.records:
-        alliance = None
-        if r.alliance_name:
-            alliance = (
-                db.query(Alliance)
-                .filter_by(name=r.alliance_name, kingdom_id=kingdom.id)
-                .first()
+    # Alliances: one IN query, then INSERT ... RETURNING for the missing names
+    alliance_names = {r.alliance_name for r in payload.records if r.alliance_name}
+    alliance_ids: Dict[str, int] = {}
+    if alliance_names:
+        alliance_ids = dict(
+            db.query(Alliance.name, Alliance.id)
+            .filter(Alliance.kingdom_id == kingdom_id, Alliance.name.in_(alliance_names))
+            .all()
+        )
+        missing = sorted(alliance_names - alliance_ids.keys())
+        if missing:
+            alliance_ids.update(
+                db.execute(
+                    insert(Alliance).returning(Alliance.name, Alliance.id),
+                    [{"name": name, "tag": name[:10], "kingdom_id": kingdom_id} for name in missing],
+                ).all()
             )
-            if not alliance:
-                alliance = Alliance(
-                    name=r.alliance_name,
-                    tag=r.alliance_name[:10],
-                    kingdom_id=kingdom.id,
-                )
-                db.add(alliance)
-                db.flush()
 
-        governor = db.query(Governor).filter_by(governor_id=r.governor_id).first()
-        if not governor:
-            governor = Governor(
-                governor_id=r.governor_id,
-                name=r.governor_name,
-                kingdom_id=kingdom.id,
-                alliance_id=alliance.id if alliance else None,
-            )
-            db.add(governor)
-            db.flush()
-        else:
+    # Governors: upsert on the unique governor_id, one statement per batch. A
+    # governor keeps its alliance when the record has none.
+    governor_upsert = _dialect_insert(Governor)
+    governor_upsert = governor_upsert.on_conflict_do_update(
+        index_elements=["governor_id"],
+        set_={
+            "name": governor_upsert.excluded.name,
+            "alliance_id": func.coalesce(governor_upsert.excluded.alliance_id, Governor.alliance_id),
+        },
+    ).returning(Governor.governor_id, Governor.id)
+
+    governor_pks: Dict[int, int] = {}
+    name_changes = []
+    # Upserted in governor_id order (stable, so a governor's later records still win):
+    # governor_id is global and players migrate, so concurrent ingests of different
+    # kingdoms can touch the same rows and must lock them in the same order
+    for batch in _batched(sorted(payload.records, key=lambda r: r.governor_id)):
+        # Current names, so renames can be recorded before the upsert overwrites them
+        names = dict(
+            db.execute(
+                _GOVERNOR_NAMES_BY_ID,
+                {"governor_ids": list({r.governor_id for r in batch})},
+            ).all()
+        )
+        values: Dict[int, Dict[str, Any]] = {}
+        for r in batch:
             # Detect name change
-            old_name = governor.name
+            old_name = names.get(r.governor_id)
             new_name = r.governor_name
             if old_name and new_name and old_name.strip() != new_name.strip():
-                name_change = GovernorNameHistory(
-                    governor_id_fk=governor.id,
-                    governor_id=r.governor_id,
-                    old_name=old_name,
-                    new_name=new_name,
-                    ingest_file_id=ingest_file.id,
-                )
-                db.add(name_change)
-            
-            governor.name = r.governor_name  # type: ignore[attr-defined]
-            if alliance:
-                governor.alliance_id = alliance.id
-            db.add(governor)
-
-        snapshot = GovernorSnapshot(
-            governor_id_fk=governor.id,
-            ingest_file_id=ingest_file.id,
-            power=r.power,
-            kill_points=r.kill_points,
-            t1_kills=r.t1_kills,
-            t2_kills=r.t2_kills,
-            t3_kills=r.t3_kills,
-            t4_kills=r.t4_kills,
-            t5_kills=r.t5_kills,
-            dead=r.dead,
-            rss_gathered=r.rss_gathered,
-            rss_assistance=r.rss_assistance,
-            helps=r.helps,
-        )
-        db.add(snapshot)
+                name_changes.append((r.governor_id, old_name, new_name))
+            names[r.governor_id] = new_name
+
+            # One row per governor (a statement can't upsert the same row twice)
+            row = values.setdefault(r.governor_id, {
+                "governor_id": r.governor_id,
+                "kingdom_id": kingdom_id,
+                "alliance_id": None,
+            })
+            row["name"] = new_name
+            if r.alliance_name:
+                row["alliance_id"] = alliance_ids[r.alliance_name]
+        governor_pks.update(db.execute(governor_upsert, list(values.values())).all())
+
+    for batch in _batched([
+        {
+            "governor_id_fk": governor_pks[governor_id],
+            "governor_id": governor_id,
+            "old_name": old_name,
+            "new_name": new_name,
+            "ingest_file_id": ingest_file.id,
+        }
+        for governor_id, old_name, new_name in name_changes
+    ]):
+        db.execute(insert(GovernorNameHistory), batch)
 
-    db.commit()
+    snapshot_rows = [
+        {
+            "governor_id_fk": governor_pks[r.governor_id],
+            "ingest_file_id": ingest_file.id,
+            "power": r.power,
+            "kill_points": r.kill_points,
+            "t1_kills": r.t1_kills,
+            "t2_kills": r.t2_kills,
+            "t3_kills": r.t3_kills,
+            "t4_kills": r.t4_kills,
+            "t5_kills": r.t5_kills,
+            "dead": r.dead,
+            "rss_gathered": r.rss_gathered,
+            "rss_assistance": r.rss_assistance,
+            "helps": r.helps,
+        }
+        for r in payload.records
+    ]
+
+    # Snapshots are written with COPY or an executemany per batch instead of one ORM INSERT per record
+    if INGEST_USE_COPY and engine.dialect.name == "postgresql" and len(snapshot_rows) >= SNAPSHOT_COPY_MIN_ROWS:
+        _copy_snapshots(db, snapshot_rows)
+    else:
+        for batch in _batched(snapshot_rows):
+            db.execute(insert(GovernorSnapshot), batch)
+
+    if commit:
+        db.commit()
+    else:
+        db.flush()
     return len(payload.records)
 
 
@@ -268,7 +477,6 @@ def setup_kingdom(
     
     # Generate unique access code if not exists
     if not kingdom.access_code:  # type: ignore[truthy-bool]
-        import secrets
         kingdom.access_code = f"RoK-{secrets.token_urlsafe(8)}"  # type: ignore[assignment]
     
     if req.name:
@@ -610,36 +818,35 @@ def get_dkp_rule(
     _=Depends(rate_limiter),
 ):
     """Get the current DKP weights for a kingdom."""
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    kingdom_id = _kingdom_id_for_number(db, kingdom_number)
+    if kingdom_id is None:
         return {"dkp_enabled": True, "weight_t4": 2.0, "weight_t5": 4.0, "weight_dead": 6.0, "use_power_penalty": True, "dkp_goal": 0, "power_tiers": None}
     
+    now = time.time()
+    cached = _dkp_rule_cache.get(kingdom_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    
     rule = (
         db.query(DKPRule)
-        .filter(DKPRule.kingdom_id == kingdom.id)
+        .filter(DKPRule.kingdom_id == kingdom_id)
         .order_by(DKPRule.updated_at.desc())
         .first()
     )
     if not rule:
-        return {"dkp_enabled": True, "weight_t4": 2.0, "weight_t5": 4.0, "weight_dead": 6.0, "use_power_penalty": True, "dkp_goal": 0, "power_tiers": None}
-    
-    # Parse power_tiers from JSON string
-    power_tiers = None
-    if rule.power_tiers:
-        try:
-            power_tiers = json.loads(rule.power_tiers)
-        except:
-            power_tiers = None
-    
-    return {
-        "dkp_enabled": rule.dkp_enabled if hasattr(rule, 'dkp_enabled') and rule.dkp_enabled is not None else True,
-        "weight_t4": float(rule.weight_t4) if rule.weight_t4 else 2.0,
-        "weight_t5": float(rule.weight_t5) if rule.weight_t5 else 4.0,
-        "weight_dead": float(rule.weight_dead) if rule.weight_dead else 6.0,
-        "use_power_penalty": rule.use_power_penalty if hasattr(rule, 'use_power_penalty') and rule.use_power_penalty is not None else True,
-        "dkp_goal": rule.dkp_goal or 0,
-        "power_tiers": power_tiers,
-    }
+        config = {"dkp_enabled": True, "weight_t4": 2.0, "weight_t5": 4.0, "weight_dead": 6.0, "use_power_penalty": True, "dkp_goal": 0, "power_tiers": None}
+    else:
+        config = {
+            "dkp_enabled": rule.dkp_enabled if hasattr(rule, 'dkp_enabled') and rule.dkp_enabled is not None else True,
+            "weight_t4": float(rule.weight_t4) if rule.weight_t4 else 2.0,
+            "weight_t5": float(rule.weight_t5) if rule.weight_t5 else 4.0,
+            "weight_dead": float(rule.weight_dead) if rule.weight_dead else 6.0,
+            "use_power_penalty": rule.use_power_penalty if hasattr(rule, 'use_power_penalty') and rule.use_power_penalty is not None else True,
+            "dkp_goal": rule.dkp_goal or 0,
+            "power_tiers": rule.power_tiers or None,  # JSON column, already decoded
+        }
+    _dkp_rule_cache[kingdom_id] = (config, now + DKP_RULE_CACHE_TTL_SECONDS)
+    return config
 
 
 @app.post("/kingdoms/{kingdom_number}/dkp-rule")
@@ -690,7 +897,7 @@ def set_dkp_rule(
             weight_dead=config.weight_dead,
             use_power_penalty=config.use_power_penalty,
             dkp_goal=config.dkp_goal or 0,
-            power_tiers=json.dumps([t.dict() for t in config.power_tiers]) if config.power_tiers else None,
+            power_tiers=[t.dict() for t in config.power_tiers] if config.power_tiers else None,
         )
         db.add(rule)
     else:
@@ -700,14 +907,14 @@ def set_dkp_rule(
         rule.weight_dead = config.weight_dead  # type: ignore[assignment]
         rule.use_power_penalty = config.use_power_penalty  # type: ignore[assignment]
         rule.dkp_goal = config.dkp_goal or 0  # type: ignore[assignment]
-        # Save power_tiers as JSON string
         if config.power_tiers:
-            rule.power_tiers = json.dumps([t.dict() for t in config.power_tiers])  # type: ignore[assignment]
+            rule.power_tiers = [t.dict() for t in config.power_tiers]  # type: ignore[assignment]
         else:
             rule.power_tiers = None  # type: ignore[assignment]
         db.add(rule)
 
     db.commit()
+    _dkp_rule_cache.pop(kingdom.id, None)
     return {"status": "ok", "kingdom": kingdom_number, "weights": config.dict()}
 
 
@@ -732,6 +939,7 @@ def get_name_changes(
         db.query(GovernorNameHistory)
         .join(Governor, GovernorNameHistory.governor_id_fk == Governor.id)
         .filter(Governor.kingdom_id == kingdom.id)
+        .options(joinedload(GovernorNameHistory.governor).joinedload(Governor.alliance))
         .order_by(GovernorNameHistory.changed_at.desc())
         .offset(skip)
         .limit(limit)
@@ -1123,13 +1331,40 @@ def list_kingdom_governors(
     total = governors_query.count()
     
     # Get ALL governors to sort properly (we need snapshot data for sorting)
-    all_governors = governors_query.all()
+    all_governors = governors_query.options(joinedload(Governor.alliance)).all()
+    
+    # Latest snapshot and active ban for the whole kingdom in one query each,
+    # instead of two queries per governor
+    latest_at = (
+        db.query(
+            GovernorSnapshot.governor_id_fk,
+            func.max(GovernorSnapshot.created_at).label("created_at"),
+        )
+        .join(Governor, Governor.id == GovernorSnapshot.governor_id_fk)
+        .filter(Governor.kingdom_id == kingdom.id)
+        .group_by(GovernorSnapshot.governor_id_fk)
+        .subquery()
+    )
+    latest_snapshots = {
+        s.governor_id_fk: s
+        for s in db.query(GovernorSnapshot).join(
+            latest_at,
+            and_(
+                GovernorSnapshot.governor_id_fk == latest_at.c.governor_id_fk,
+                GovernorSnapshot.created_at == latest_at.c.created_at,
+            ),
+        )
+    }
+    active_bans = {
+        b.governor_id: b
+        for b in db.query(PlayerBan).filter_by(kingdom_id=kingdom.id, is_active=True)
+    }
     
     # Build result with latest snapshots for ALL governors first
     items_list = []
     for gov in all_governors:
-        latest = db.query(GovernorSnapshot).filter_by(governor_id_fk=gov.id).order_by(GovernorSnapshot.created_at.desc()).first()
-        ban = db.query(PlayerBan).filter_by(governor_id=gov.governor_id, kingdom_id=kingdom.id, is_active=True).first()
+        latest = latest_snapshots.get(gov.id)
+        ban = active_bans.get(gov.governor_id)
         
         item = {
             "governor_id": gov.governor_id,
@@ -1204,13 +1439,9 @@ def create_ban(
     expires_days: Optional[int] = None,
     banned_by: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_kingdom: int = Depends(require_kingdom_auth),  # Require authentication
+    _=Depends(require_path_kingdom_access),  # Require authentication for this kingdom
 ):
     """Create a new ban for a player. Requires kingdom authentication."""
-    # Verify user has access to this kingdom
-    if current_kingdom != kingdom_number:
-        raise HTTPException(status_code=403, detail="Access denied to this kingdom")
-    
     kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
     if not kingdom:
         raise HTTPException(status_code=404, detail="Kingdom not found")
@@ -1250,13 +1481,9 @@ def remove_ban(
     kingdom_number: int,
     ban_id: int,
     db: Session = Depends(get_db),
-    current_kingdom: int = Depends(require_kingdom_auth),  # Require authentication
+    _=Depends(require_path_kingdom_access),  # Require authentication for this kingdom
 ):
     """Remove a ban. Requires kingdom authentication."""
-    # Verify user has access to this kingdom
-    if current_kingdom != kingdom_number:
-        raise HTTPException(status_code=403, detail="Access denied to this kingdom")
-    
     kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
     if not kingdom:
         raise HTTPException(status_code=404, detail="Kingdom not found")
@@ -1511,7 +1738,6 @@ def admin_create_kingdom(
         raise HTTPException(status_code=400, detail="Kingdom already exists")
     
     # Generate password and access code
-    import secrets
     new_password = generate_password()
     access_code = f"RoK-{secrets.token_urlsafe(8)}"
     
@@ -1568,8 +1794,11 @@ def admin_delete_kingdom(
     if not kingdom:
         raise HTTPException(status_code=404, detail="Kingdom not found")
     
+    kingdom_id = kingdom.id
     db.delete(kingdom)
     db.commit()
+    _invalidate_kingdom_ids()
+    _dkp_rule_cache.pop(kingdom_id, None)
     
     return {"status": "deleted", "kingdom": kingdom_number}
 
@@ -1584,118 +1813,227 @@ def admin_me(admin: Dict = Depends(require_admin)):
 # SCAN IMPORT FROM CSV FILES
 # ============================================================
 
-def import_csv_from_path(csv_path: str, db: Session) -> dict:
-    """Import a CSV file from the server filesystem into the database."""
-    import pandas as pd
-    from pathlib import Path
-    
-    def safe_int(val) -> int:
-        if val in ["Skipped", "Unknown", "", None]:
-            return 0
-        try:
-            if pd.isna(val):
-                return 0
-            return int(str(val).replace(",", "").strip())
-        except:
-            return 0
-    
-    def extract_kingdom_from_filename(filename: str) -> int:
-        match = re.search(r'-(\d{4})-\[', filename)
-        if match:
-            return int(match.group(1))
-        match = re.search(r'(\d{4})', filename)
-        if match:
-            return int(match.group(1))
-        return 0
-    
+# Candidate locations for the scans folder, in lookup order
+_SCANS_FOLDER_CANDIDATES = [
+    Path(__file__).parent.parent.parent / "RokTracker" / "scans_kingdom",  # backend -> project root
+    Path(__file__).parent.parent.parent.parent / "RokTracker" / "scans_kingdom",
+    Path("/app/RokTracker/scans_kingdom"),  # Docker path
+]
+_scans_folder_cache: Optional[Path] = None
+
+
+def _scans_folder() -> Optional[Path]:
+    """Resolve the scans folder once and reuse it (a miss is retried on the next call)."""
+    global _scans_folder_cache
+    if _scans_folder_cache is None or not _scans_folder_cache.exists():
+        _scans_folder_cache = next((p for p in _SCANS_FOLDER_CANDIDATES if p.exists()), None)
+    return _scans_folder_cache
+
+
+# Number of CSVs hashed and parsed in parallel during a folder import. Ingest stays
+# serial, oldest file first, in one transaction: governor_id is global (players
+# migrate between kingdoms), so the newest scan must be the one that wins
+SCAN_IMPORT_WORKERS = int(os.getenv("SCAN_IMPORT_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
+# Columns read from RokTracker kingdom CSVs (the rest of the file is ignored),
+# mapped to the RokTrackerRecord fields they fill
+_SCAN_CSV_FIELDS = {
+    "ID": "governor_id",
+    "Name": "governor_name",
+    "Alliance": "alliance_name",
+    "Power": "power",
+    "Killpoints": "kill_points",
+    "T1 Kills": "t1_kills",
+    "T2 Kills": "t2_kills",
+    "T3 Kills": "t3_kills",
+    "T4 Kills": "t4_kills",
+    "T5 Kills": "t5_kills",
+    "Deads": "dead",
+    "Rss Gathered": "rss_gathered",
+    "Rss Assistance": "rss_assistance",
+    "Helps": "helps",
+}
+_SCAN_CSV_COLUMNS = list(_SCAN_CSV_FIELDS)
+_SCAN_TEXT_COLUMNS = ["Name", "Alliance"]
+_SCAN_INT_COLUMNS = [c for c in _SCAN_CSV_COLUMNS if c not in _SCAN_TEXT_COLUMNS]
+
+
+# Kingdom number in scan filenames, e.g. 'TOP250-2025-12-29-3328-[gs1dp0ow].csv'
+_KINGDOM_RE_STRICT = re.compile(r'-(\d{4})-\[')
+_KINGDOM_RE_LOOSE = re.compile(r'(\d{4})')
+
+
+def extract_kingdom_from_filename(filename: str) -> int:
+    match = _KINGDOM_RE_STRICT.search(filename) or _KINGDOM_RE_LOOSE.search(filename)
+    return int(match.group(1)) if match else 0
+
+
+def _scan_csv_entries(scans_folder: Path) -> List[Tuple[str, os.stat_result]]:
+    """(name, stat) of every scan CSV in the folder, oldest first.
+
+    Hidden files (e.g. '._*.csv' copied from macOS) are skipped. Both the admin
+    listing and the folder import use this, so they always see the same files;
+    scandir gives one stat per file for the sort and the caller.
+    """
+    with os.scandir(scans_folder) as it:
+        entries = [
+            (e.name, e.stat())
+            for e in it
+            if e.name.endswith(".csv") and not e.name.startswith(".") and e.is_file()
+        ]
+    entries.sort(key=lambda t: t[1].st_mtime)
+    return entries
+
+
+def _file_sha256(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _manifest_skip_result(path: Path) -> dict:
+    """Result for a file whose exact bytes were already imported (not parsed again)."""
+    return {
+        "status": "skipped",
+        "file": path.name,
+        "imported": 0,
+        "kingdom": extract_kingdom_from_filename(path.name)
+    }
+
+
+def parse_scan_csv(csv_path: str, sha256: Optional[str] = None) -> dict:
+    """Parse a scan CSV into a validated payload.
+
+    No database access, so several files can be parsed in worker threads.
+    Returns status "parsed" on success or an error result for the file.
+    The file hash, if given, is kept so the import can be recorded in the manifest.
+    """
     path = Path(csv_path)
     if not path.exists():
         return {"status": "error", "message": f"File not found: {csv_path}"}
     
     try:
-        df = pd.read_csv(path)
+        # Numbers ('1,234') and RokTracker sentinels are handled by the C parser;
+        # columns RokTracker dropped from the file are simply absent
+        df = pd.read_csv(
+            path,
+            usecols=lambda c: c in _SCAN_CSV_COLUMNS,
+            dtype={c: "string" for c in _SCAN_TEXT_COLUMNS},
+            na_values={c: ["Skipped", "Unknown"] for c in _SCAN_INT_COLUMNS},
+            thousands=",",
+        )
+        for col in _SCAN_INT_COLUMNS:
+            if col in df.columns:
+                numbers = pd.to_numeric(df[col], errors="coerce")
+                # astype("int64") would silently wrap these; reject the file instead
+                out_of_range = (numbers >= 2**63) | (numbers < -2**63)
+                if out_of_range.any():
+                    bad = df[col][out_of_range].iloc[0]
+                    return {
+                        "status": "error",
+                        "message": f"{col} value out of range in {path.name}: {bad}",
+                        "file": path.name,
+                    }
+                df[col] = numbers.fillna(0).astype("int64")
+            else:
+                df[col] = 0
+        for col in _SCAN_TEXT_COLUMNS:
+            if col not in df.columns:
+                df[col] = pd.Series(pd.NA, index=df.index, dtype="string")
         kingdom_num = extract_kingdom_from_filename(path.name)
         
         if kingdom_num == 0:
             return {"status": "error", "message": f"Could not extract kingdom from filename: {path.name}"}
         
-        records = []
-        for _, row in df.iterrows():
-            record = {
-                "governor_id": safe_int(row.get("ID")),
-                "governor_name": row.get("Name") or "Unknown",
-                "kingdom": kingdom_num,
-                "power": safe_int(row.get("Power")),
-                "kill_points": safe_int(row.get("Killpoints")),
-                "alliance_name": row.get("Alliance") if not pd.isna(row.get("Alliance")) else None,
-                "t1_kills": safe_int(row.get("T1 Kills")),
-                "t2_kills": safe_int(row.get("T2 Kills")),
-                "t3_kills": safe_int(row.get("T3 Kills")),
-                "t4_kills": safe_int(row.get("T4 Kills")),
-                "t5_kills": safe_int(row.get("T5 Kills")),
-                "dead": safe_int(row.get("Deads")),
-                "rss_gathered": safe_int(row.get("Rss Gathered")),
-                "rss_assistance": safe_int(row.get("Rss Assistance")),
-                "helps": safe_int(row.get("Helps")),
-            }
-            if record["governor_id"]:
-                records.append(record)
+        # Row filter (only positive governor ids) and name/alliance cleanup as column operations
+        df = df.loc[df["ID"] > 0]
+        df = df.assign(
+            Name=df["Name"].fillna("Unknown").replace("", "Unknown"),
+            Alliance=df["Alliance"].astype(object).where(df["Alliance"].notna(), None),
+        )
+        records = (
+            df[_SCAN_CSV_COLUMNS]
+            .rename(columns=_SCAN_CSV_FIELDS)
+            .assign(kingdom=kingdom_num)
+            .to_dict("records")
+        )
         
         if not records:
             return {"status": "error", "message": f"No valid records in {path.name}"}
         
-        # Convert to RokTrackerPayload format
-        from .schemas import RokTrackerPayload, RokTrackerRecord
-        payload = RokTrackerPayload(
-            scan_type="kingdom",
-            source_file=path.name,
-            records=[RokTrackerRecord(**r) for r in records]
-        )
-        
-        ingest_hash = compute_ingest_hash(payload)
-        imported = process_ingest(db, payload, ingest_hash)
+        # Convert to RokTrackerPayload format (validates the whole record list in one pass)
+        payload = RokTrackerPayload.parse_obj({
+            "scan_type": "kingdom",
+            "source_file": path.name,
+            "records": records,
+        })
         
         return {
-            "status": "ok" if imported > 0 else "skipped",
+            "status": "parsed",
             "file": path.name,
-            "imported": imported,
-            "kingdom": kingdom_num
+            "kingdom": kingdom_num,
+            "payload": payload,
+            "ingest_hash": compute_ingest_hash(payload),
+            "sha256": sha256,
         }
         
     except Exception as e:
         return {"status": "error", "message": str(e), "file": path.name}
 
 
-@app.post("/admin/import-scans")
-def admin_import_scans_from_folder(
-    admin: Dict = Depends(require_admin),
-    db: Session = Depends(get_db)
-):
-    """
-    Import all CSV scan files from the RokTracker/scans_kingdom folder.
-    This reads files directly from the server filesystem.
+def ingest_parsed_scan(parsed: dict, db: Session, commit: bool = True) -> dict:
+    """Write a parse_scan_csv() result to the database.
+
+    With commit=False the file is written inside a savepoint and the caller
+    commits, so a whole folder can be imported in a single transaction.
     """
-    from pathlib import Path
-    
-    # Find the scans folder - try multiple possible locations
-    base_path = Path(__file__).parent.parent.parent  # backend -> project root
-    possible_paths = [
-        base_path / "RokTracker" / "scans_kingdom",
-        base_path.parent / "RokTracker" / "scans_kingdom",
-        Path("/app/RokTracker/scans_kingdom"),  # Docker path
-    ]
+    if parsed["status"] != "parsed":
+        return parsed
     
-    scans_folder = None
-    for p in possible_paths:
-        if p.exists():
-            scans_folder = p
-            break
-    
-    if not scans_folder:
-        raise HTTPException(status_code=404, detail=f"Scans folder not found. Tried: {[str(p) for p in possible_paths]}")
-    
-    # Find all CSV files
-    csv_files = sorted(scans_folder.glob("*.csv"), key=lambda x: x.stat().st_mtime)
+    try:
+        if commit:
+            try:
+                imported = process_ingest(db, parsed["payload"], parsed["ingest_hash"], commit=False)
+                _record_scan_manifest(db, parsed)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        else:
+            with db.begin_nested():
+                imported = process_ingest(db, parsed["payload"], parsed["ingest_hash"], commit=False)
+                _record_scan_manifest(db, parsed)
+        
+        return {
+            "status": "ok" if imported > 0 else "skipped",
+            "file": parsed["file"],
+            "imported": imported,
+            "kingdom": parsed["kingdom"]
+        }
+        
+    except Exception as e:
+        return {"status": "error", "message": str(e), "file": parsed["file"]}
+
+
+def _record_scan_manifest(db: Session, parsed: dict) -> None:
+    if parsed.get("sha256"):
+        db.add(IngestManifest(filename=parsed["file"], sha256=parsed["sha256"]))
+
+
+def import_csv_from_path(csv_path: str, db: Session, commit: bool = True) -> dict:
+    """Import a CSV file from the server filesystem into the database."""
+    path = Path(csv_path)
+    sha256 = None
+    if path.exists():
+        # Unchanged files are skipped on their hash, before any parsing
+        sha256 = _file_sha256(path)
+        if db.query(IngestManifest.id).filter_by(filename=path.name, sha256=sha256).first():
+            return _manifest_skip_result(path)
+    return ingest_parsed_scan(parse_scan_csv(csv_path, sha256), db, commit=commit)
+
+
+def _import_scan_folder(scans_folder: Path, db: Session) -> dict:
+    """Import every CSV in the scans folder (oldest first) and commit once at the end."""
+    csv_files = [scans_folder / name for name, _ in _scan_csv_entries(scans_folder)]
     
     if not csv_files:
         return {
@@ -1710,16 +2048,34 @@ def admin_import_scans_from_folder(
     skipped = 0
     errors = 0
     
-    for csv_path in csv_files:
-        result = import_csv_from_path(str(csv_path), db)
-        results.append(result)
+    with ThreadPoolExecutor(max_workers=SCAN_IMPORT_WORKERS) as pool:
+        # Files whose exact bytes are already in the manifest are not parsed again
+        digests = list(pool.map(_file_sha256, csv_files))
+        seen = set(
+            db.query(IngestManifest.filename, IngestManifest.sha256)
+            .filter(IngestManifest.filename.in_([f.name for f in csv_files]))
+            .all()
+        )
+        known = [(f.name, d) in seen for f, d in zip(csv_files, digests)]
+        pending = [(str(f), d) for f, d, hit in zip(csv_files, digests, known) if not hit]
         
-        if result["status"] == "ok":
-            new_imports += 1
-        elif result["status"] == "skipped":
-            skipped += 1
-        else:
-            errors += 1
+        # Parse new files in worker threads; ingest serially on this session, in file order
+        parsed_iter = pool.map(parse_scan_csv, *zip(*pending)) if pending else iter(())
+        for csv_file, hit in zip(csv_files, known):
+            if hit:
+                result = _manifest_skip_result(csv_file)
+            else:
+                result = ingest_parsed_scan(next(parsed_iter), db, commit=False)
+            results.append(result)
+            
+            if result["status"] == "ok":
+                new_imports += 1
+            elif result["status"] == "skipped":
+                skipped += 1
+            else:
+                errors += 1
+    
+    db.commit()
     
     return {
         "status": "ok",
@@ -1732,40 +2088,42 @@ def admin_import_scans_from_folder(
     }
 
 
+@app.post("/admin/import-scans")
+def admin_import_scans_from_folder(
+    admin: Dict = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Import all CSV scan files from the RokTracker/scans_kingdom folder.
+    This reads files directly from the server filesystem.
+    """
+    scans_folder = _scans_folder()
+    if not scans_folder:
+        raise HTTPException(status_code=404, detail=f"Scans folder not found. Tried: {[str(p) for p in _SCANS_FOLDER_CANDIDATES]}")
+    
+    return _import_scan_folder(scans_folder, db)
+
+
 @app.get("/admin/scan-files")
 def admin_list_scan_files(
     admin: Dict = Depends(require_admin),
 ):
     """List CSV files in the scans folder."""
-    from pathlib import Path
-    
-    base_path = Path(__file__).parent.parent.parent
-    possible_paths = [
-        base_path / "RokTracker" / "scans_kingdom",
-        base_path.parent / "RokTracker" / "scans_kingdom",
-        Path("/app/RokTracker/scans_kingdom"),
-    ]
-    
-    scans_folder = None
-    for p in possible_paths:
-        if p.exists():
-            scans_folder = p
-            break
-    
+    scans_folder = _scans_folder()
     if not scans_folder:
         return {"folder": None, "files": []}
     
-    csv_files = sorted(scans_folder.glob("*.csv"), key=lambda x: x.stat().st_mtime, reverse=True)
+    entries = _scan_csv_entries(scans_folder)[::-1]  # newest first
     
     return {
         "folder": str(scans_folder),
         "files": [
             {
-                "name": f.name,
-                "size": f.stat().st_size,
-                "modified": datetime.fromtimestamp(f.stat().st_mtime).isoformat()
+                "name": name,
+                "size": st.st_size,
+                "modified": datetime.fromtimestamp(st.st_mtime).isoformat()
             }
-            for f in csv_files
+            for name, st in entries
         ]
     }
 
@@ -1784,13 +2142,10 @@ def internal_import_scans(
     Can be called via CLI script on the server.
     Protected by: internal key, localhost-only access, or valid kingdom/admin token.
     """
-    from pathlib import Path
-    
     # Verificar acesso: localhost, chave interna, ou token válido (kingdom ou admin)
-    internal_key = os.getenv("INTERNAL_API_KEY", "rok-internal-import-key")
     client_host = request.client.host if request.client else ""
-    is_local = client_host in ("127.0.0.1", "localhost", "::1", "172.17.0.1")  # inclui Docker host
-    has_valid_key = x_internal_key == internal_key
+    is_local = client_host in LOCAL_HOSTS
+    has_valid_key = x_internal_key == INTERNAL_API_KEY
     
     # Verificar se tem token válido (kingdom ou admin)
     has_valid_token = False
@@ -1813,63 +2168,28 @@ def internal_import_scans(
         )
     
     # Find the scans folder
-    base_path = Path(__file__).parent.parent.parent
-    possible_paths = [
-        base_path / "RokTracker" / "scans_kingdom",
-        base_path.parent / "RokTracker" / "scans_kingdom",
-        Path("/app/RokTracker/scans_kingdom"),
-    ]
-    
-    scans_folder = None
-    for p in possible_paths:
-        if p.exists():
-            scans_folder = p
-            break
-    
+    scans_folder = _scans_folder()
     if not scans_folder:
-        raise HTTPException(status_code=404, detail=f"Scans folder not found. Tried: {[str(p) for p in possible_paths]}")
-    
-    csv_files = sorted(scans_folder.glob("*.csv"), key=lambda x: x.stat().st_mtime)
-    
-    if not csv_files:
-        return {
-            "status": "ok",
-            "message": "No CSV files found",
-            "folder": str(scans_folder),
-            "results": []
-        }
-    
-    results = []
-    new_imports = 0
-    skipped = 0
-    errors = 0
-    
-    for csv_path in csv_files:
-        result = import_csv_from_path(str(csv_path), db)
-        results.append(result)
-        
-        if result["status"] == "ok":
-            new_imports += 1
-        elif result["status"] == "skipped":
-            skipped += 1
-        else:
-            errors += 1
+        raise HTTPException(status_code=404, detail=f"Scans folder not found. Tried: {[str(p) for p in _SCANS_FOLDER_CANDIDATES]}")
     
-    return {
-        "status": "ok",
-        "folder": str(scans_folder),
-        "total_files": len(csv_files),
-        "new_imports": new_imports,
-        "skipped": skipped,
-        "errors": errors,
-        "results": results
-    }
+    return _import_scan_folder(scans_folder, db)
 
 
 # ============================================================
 # TITLE BOT ENDPOINTS
 # ============================================================
 
+# Names that are really clipboard/Parcel exception artifacts or bot placeholders,
+# e.g. 'null', '........A.t.t.e.' - checked in a single regex pass
+_BAD_GOVERNOR_NAME_RE = re.compile(
+    r"^null$"
+    r"|^__rok_sentinel__"
+    r"|^\.{4,}(?:[a-z]\.){2,}"
+    r"|attempt to invoke virtual method"
+    r"|not a data message",
+    re.IGNORECASE,
+)
+
 
 @app.get("/kingdoms/{kingdom_number}/titles/settings", response_model=TitleBotSettingsResponse)
 def get_title_bot_settings(
@@ -1877,11 +2197,11 @@ def get_title_bot_settings(
     db: Session = Depends(get_db),
     _=Depends(rate_limiter),
 ):
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    kingdom_id = _kingdom_id_for_number(db, kingdom_number)
+    if kingdom_id is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
 
-    settings = db.query(TitleBotSettings).filter(TitleBotSettings.kingdom_id == kingdom.id).first()
+    settings = db.query(TitleBotSettings).filter(TitleBotSettings.kingdom_id == kingdom_id).first()
     if not settings:
         return {"bot_alliance_tag": None, "bot_alliance_name": None}
 
@@ -1896,20 +2216,16 @@ def update_title_bot_settings(
     kingdom_number: int,
     payload: TitleBotSettingsUpdate,
     db: Session = Depends(get_db),
-    current_kingdom: int = Depends(require_kingdom_auth),  # Require authentication
+    _=Depends(require_path_kingdom_access),  # Require authentication for this kingdom
 ):
     """Update title bot settings. Requires kingdom authentication."""
-    # Verify user has access to this kingdom
-    if current_kingdom != kingdom_number:
-        raise HTTPException(status_code=403, detail="Access denied to this kingdom")
-    
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    kingdom_id = _kingdom_id_for_number(db, kingdom_number)
+    if kingdom_id is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
 
-    settings = db.query(TitleBotSettings).filter(TitleBotSettings.kingdom_id == kingdom.id).first()
+    settings = db.query(TitleBotSettings).filter(TitleBotSettings.kingdom_id == kingdom_id).first()
     if not settings:
-        settings = TitleBotSettings(kingdom_id=kingdom.id)
+        settings = TitleBotSettings(kingdom_id=kingdom_id)
         db.add(settings)
 
     if payload.bot_alliance_tag is not None:
@@ -1933,8 +2249,8 @@ def create_title_request(
     _=Depends(rate_limiter),
 ):
     """Create a new title request."""
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    kingdom_id = _kingdom_id_for_number(db, kingdom_number)
+    if kingdom_id is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
     
     # Validate title type
@@ -1943,7 +2259,7 @@ def create_title_request(
         raise HTTPException(status_code=400, detail=f"Invalid title. Must be one of: {valid_titles}")
 
     # For now, only allow requests from the configured alliance tag (if set).
-    settings = db.query(TitleBotSettings).filter(TitleBotSettings.kingdom_id == kingdom.id).first()
+    settings = db.query(TitleBotSettings).filter(TitleBotSettings.kingdom_id == kingdom_id).first()
     configured_tag = (settings.bot_alliance_tag or "").strip().upper() if settings else ""
     if configured_tag:
         req_tag = ((request.alliance_tag or "").strip().upper())
@@ -1956,62 +2272,62 @@ def create_title_request(
     # Guardrail: reject common clipboard/Parcel exception artifacts as names.
     # Example observed: '........A.t.t.e.'
     gov_name = (request.governor_name or "").strip()
-    low = gov_name.lower()
-    if not gov_name or len(gov_name) < 2:
-        raise HTTPException(status_code=400, detail="Invalid governor name")
-    if low == "null":
-        raise HTTPException(status_code=400, detail="Invalid governor name")
-    if "attempt to invoke virtual method" in low or "not a data message" in low:
-        raise HTTPException(status_code=400, detail="Invalid governor name")
-    if low.startswith("__rok_sentinel__"):
-        raise HTTPException(status_code=400, detail="Invalid governor name")
-    if re.match(r"^\.{4,}([a-zA-Z]\.){2,}", gov_name):
+    if len(gov_name) < 2 or _BAD_GOVERNOR_NAME_RE.search(gov_name):
         raise HTTPException(status_code=400, detail="Invalid governor name")
 
-    # Check for existing pending request for same requester/title.
-    # If the bot couldn't resolve a governor_id, we accept governor_id=0 and
-    # dedupe by governor_name + title_type to avoid blocking all unknown players.
-    existing_query = db.query(TitleRequest).filter(
-        TitleRequest.kingdom_id == kingdom.id,
+    # At most one pending/assigned request per requester and title. If the bot
+    # couldn't resolve a governor_id, we accept governor_id=0 and dedupe by
+    # lower(governor_name) + title_type to avoid blocking all unknown players.
+    # The partial unique indexes on title_requests close the race between two
+    # concurrent requests; this check still covers databases created by
+    # create_all() before those indexes existed (run the migrations to add them).
+    existing_query = db.query(TitleRequest.id).filter(
+        TitleRequest.kingdom_id == kingdom_id,
         TitleRequest.title_type == req_title,
         TitleRequest.status.in_(["pending", "assigned"]),
     )
     if gov_id > 0:
         existing_query = existing_query.filter(TitleRequest.governor_id == gov_id)
     else:
-        name_norm = gov_name.strip().lower()
         existing_query = existing_query.filter(
             TitleRequest.governor_id == 0,
-            func.lower(TitleRequest.governor_name) == name_norm,
+            func.lower(TitleRequest.governor_name) == gov_name.lower(),
         )
+    if existing_query.first():
+        raise HTTPException(status_code=400, detail="You already have a pending request for this title")
 
-    existing = existing_query.first()
+    request_id = db.execute(
+        _dialect_insert(TitleRequest)
+        .values(
+            kingdom_id=kingdom_id,
+            governor_id=gov_id,
+            governor_name=gov_name,
+            alliance_tag=request.alliance_tag,
+            title_type=req_title,
+            duration_hours=request.duration_hours,
+            status="pending",
+        )
+        .on_conflict_do_nothing()
+        .returning(TitleRequest.id)
+    ).scalar()
     
-    if existing:
+    if request_id is None:
+        db.rollback()
         raise HTTPException(status_code=400, detail="You already have a pending request for this title")
     
-    title_request = TitleRequest(
-        kingdom_id=kingdom.id,
-        governor_id=gov_id,
-        governor_name=gov_name,
-        alliance_tag=request.alliance_tag,
-        title_type=req_title,
-        duration_hours=request.duration_hours,
-        status="pending",
-    )
-    db.add(title_request)
+    # Index-only count on (kingdom_id, status, id)
+    position = db.query(func.count(TitleRequest.id)).filter(
+        TitleRequest.kingdom_id == kingdom_id,
+        TitleRequest.status == "pending",
+        TitleRequest.id <= request_id
+    ).scalar()
     db.commit()
-    db.refresh(title_request)
     
     return {
         "status": "ok",
         "message": "Title request created",
-        "request_id": title_request.id,
-        "position": db.query(TitleRequest).filter(
-            TitleRequest.kingdom_id == kingdom.id,
-            TitleRequest.status == "pending",
-            TitleRequest.id <= title_request.id
-        ).count()
+        "request_id": request_id,
+        "position": position,
     }
 
 
@@ -2024,11 +2340,23 @@ def get_title_queue(
     _=Depends(rate_limiter),
 ):
     """Get the title request queue for a kingdom."""
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    kingdom_id = _kingdom_id_for_number(db, kingdom_number)
+    if kingdom_id is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
     
-    query = db.query(TitleRequest).filter(TitleRequest.kingdom_id == kingdom.id)
+    query = db.query(
+        TitleRequest.id,
+        TitleRequest.governor_id,
+        TitleRequest.governor_name,
+        TitleRequest.alliance_tag,
+        TitleRequest.title_type,
+        TitleRequest.duration_hours,
+        TitleRequest.status,
+        TitleRequest.priority,
+        TitleRequest.created_at,
+        TitleRequest.assigned_at,
+        TitleRequest.bot_message,
+    ).filter(TitleRequest.kingdom_id == kingdom_id)
     
     if status:
         query = query.filter(TitleRequest.status == status)
@@ -2067,12 +2395,20 @@ def get_my_title_requests(
     _=Depends(rate_limiter),
 ):
     """Get title requests for a specific governor."""
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    kingdom_id = _kingdom_id_for_number(db, kingdom_number)
+    if kingdom_id is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
     
-    requests = db.query(TitleRequest).filter(
-        TitleRequest.kingdom_id == kingdom.id,
+    requests = db.query(
+        TitleRequest.id,
+        TitleRequest.title_type,
+        TitleRequest.status,
+        TitleRequest.created_at,
+        TitleRequest.completed_at,
+        TitleRequest.expires_at,
+        TitleRequest.bot_message,
+    ).filter(
+        TitleRequest.kingdom_id == kingdom_id,
         TitleRequest.governor_id == governor_id
     ).order_by(TitleRequest.created_at.desc()).limit(20).all()
     
@@ -2099,13 +2435,13 @@ def cancel_title_request(
     _=Depends(rate_limiter),
 ):
     """Cancel a pending title request."""
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    kingdom_id = _kingdom_id_for_number(db, kingdom_number)
+    if kingdom_id is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
     
     title_request = db.query(TitleRequest).filter(
         TitleRequest.id == request_id,
-        TitleRequest.kingdom_id == kingdom.id,
+        TitleRequest.kingdom_id == kingdom_id,
         TitleRequest.governor_id == governor_id,
         TitleRequest.status == "pending"
     ).first()
@@ -2124,26 +2460,22 @@ def clear_title_queue(
     kingdom_number: int,
     status: Optional[str] = "pending",
     db: Session = Depends(get_db),
-    current_kingdom: int = Depends(require_kingdom_auth),  # Require authentication
+    _=Depends(require_path_kingdom_access),  # Require authentication for this kingdom
 ):
     """Clear all pending title requests for a kingdom. Requires kingdom authentication."""
-    # Verify user has access to this kingdom
-    if current_kingdom != kingdom_number:
-        raise HTTPException(status_code=403, detail="Access denied to this kingdom")
-    
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    kingdom_id = _kingdom_id_for_number(db, kingdom_number)
+    if kingdom_id is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
     
     # Delete pending requests
     if status == "all":
         count = db.query(TitleRequest).filter(
-            TitleRequest.kingdom_id == kingdom.id,
+            TitleRequest.kingdom_id == kingdom_id,
             TitleRequest.status.in_(["pending", "assigned"])
         ).delete(synchronize_session=False)
     else:
         count = db.query(TitleRequest).filter(
-            TitleRequest.kingdom_id == kingdom.id,
+            TitleRequest.kingdom_id == kingdom_id,
             TitleRequest.status == status
         ).delete(synchronize_session=False)
     
@@ -2160,10 +2492,9 @@ def require_bot_access(
     Verify access for bot endpoints.
     Accepts: localhost requests OR valid bot key.
     """
-    bot_key = os.getenv("BOT_API_KEY", os.getenv("INTERNAL_API_KEY", "rok-internal-import-key"))
     client_host = request.client.host if request.client else ""
-    is_local = client_host in ("127.0.0.1", "localhost", "::1", "172.17.0.1")
-    has_valid_key = x_bot_key == bot_key
+    is_local = client_host in LOCAL_HOSTS
+    has_valid_key = x_bot_key == BOT_API_KEY
     
     if not is_local and not has_valid_key:
         raise HTTPException(
@@ -2173,6 +2504,78 @@ def require_bot_access(
     return True
 
 
+def _claim_title_request(db: Session, kingdom_id: int, stale_before: datetime):
+    """Mark the next request for the bot as assigned and return it.
+
+    Pending requests come first, then assigned ones whose bot went quiet before
+    `stale_before`. On PostgreSQL this is one statement,
+    WITH claim AS (SELECT ... FOR UPDATE SKIP LOCKED LIMIT 1) UPDATE ... FROM claim
+    RETURNING, so concurrent bot pollers claim different rows without a
+    read-then-write race. SQLite can't RETURN columns of the FROM table, so it
+    picks the row and then updates it only if its status/assigned_at are unchanged
+    (writers are serialized there anyway). The row ends with previous_status.
+    """
+    claim = (
+        select(
+            TitleRequest.id,
+            TitleRequest.status.label("previous_status"),
+            TitleRequest.assigned_at.label("previous_assigned_at"),
+        )
+        .where(
+            TitleRequest.kingdom_id == kingdom_id,
+            or_(
+                TitleRequest.status == "pending",
+                and_(
+                    TitleRequest.status == "assigned",
+                    TitleRequest.assigned_at.isnot(None),
+                    TitleRequest.assigned_at < stale_before,
+                ),
+            ),
+        )
+        .order_by(
+            case((TitleRequest.status == "pending", 0), else_=1),
+            TitleRequest.priority.desc(),
+            TitleRequest.created_at.asc(),
+        )
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    returning = (
+        TitleRequest.id,
+        TitleRequest.governor_name,
+        TitleRequest.alliance_tag,
+        TitleRequest.title_type,
+        TitleRequest.duration_hours,
+    )
+    assign = update(TitleRequest).values(status="assigned", assigned_at=datetime.utcnow())
+
+    if db.get_bind().dialect.name == "postgresql":
+        claim = claim.cte("claim")
+        return db.execute(
+            assign.where(TitleRequest.id == claim.c.id)
+            .returning(*returning, claim.c.previous_status)
+            .execution_options(synchronize_session=False)
+        ).first()
+
+    picked = db.execute(claim).first()
+    if picked is None:
+        return None
+    claimed = db.execute(
+        assign.where(
+            TitleRequest.id == picked.id,
+            TitleRequest.status == picked.previous_status,
+            TitleRequest.assigned_at.is_(None)
+            if picked.previous_assigned_at is None
+            else TitleRequest.assigned_at == picked.previous_assigned_at,
+        )
+        .returning(*returning)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if claimed is None:
+        return None
+    return (*claimed, picked.previous_status)
+
+
 # Bot-only endpoints (protected - require localhost or bot key)
 @app.get("/bot/titles/next")
 def get_next_title_for_bot(
@@ -2181,67 +2584,32 @@ def get_next_title_for_bot(
     _=Depends(require_bot_access),
 ):
     """Get the next pending title request for the bot to process. Requires bot access."""
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    kingdom_id = _kingdom_id_for_number(db, kingdom_number)
+    if kingdom_id is None:
         return {"status": "no_request", "message": "Kingdom not found"}
     
-    # Prefer true pending requests first.
-    title_request = (
-        db.query(TitleRequest)
-        .filter(
-            TitleRequest.kingdom_id == kingdom.id,
-            TitleRequest.status == "pending",
-        )
-        .order_by(
-            TitleRequest.priority.desc(),
-            TitleRequest.created_at.asc(),
-        )
-        .first()
-    )
-
-    # If nothing is pending, recycle stale assigned requests.
-    # Rationale: if a bot fetched (assigned) and then crashed, the request would
-    # stay stuck forever (create endpoint also dedupes on assigned).
-    # This makes the system self-healing.
-    reassigned = False
-    if not title_request:
-        stale_after_seconds = int(os.getenv("TITLE_BOT_ASSIGNED_STALE_SECONDS", "180"))
-        stale_before = datetime.utcnow() - timedelta(seconds=stale_after_seconds)
-        title_request = (
-            db.query(TitleRequest)
-            .filter(
-                TitleRequest.kingdom_id == kingdom.id,
-                TitleRequest.status == "assigned",
-                TitleRequest.assigned_at.isnot(None),
-                TitleRequest.assigned_at < stale_before,
-            )
-            .order_by(
-                TitleRequest.priority.desc(),
-                TitleRequest.created_at.asc(),
-            )
-            .first()
-        )
-        if title_request:
-            reassigned = True
-    
-    if not title_request:
+    # Claim pending requests first, then stale assigned ones. Recycling stale
+    # assigned requests keeps the queue self-healing: if a bot fetched (assigned)
+    # and then crashed, the request would otherwise stay stuck forever (create
+    # endpoint also dedupes on assigned).
+    stale_before = datetime.utcnow() - timedelta(seconds=TITLE_BOT_ASSIGNED_STALE_SECONDS)
+    claimed = _claim_title_request(db, kingdom_id, stale_before)
+    if not claimed:
         return {"status": "no_request", "message": "No pending requests"}
-    
-    # Mark as assigned (or refresh assigned timestamp when recycling)
-    title_request.status = "assigned"  # type: ignore[assignment]
-    title_request.assigned_at = datetime.utcnow()  # type: ignore[assignment]
     db.commit()
+    *title_request, previous_status = claimed
+    request_id, governor_name, alliance_tag, title_type, duration_hours = title_request
     
     return {
         "status": "ok",
         "request": {
-            "id": title_request.id,
-            "governor_name": title_request.governor_name,
-            "alliance_tag": title_request.alliance_tag,
-            "title_type": title_request.title_type,
-            "duration_hours": title_request.duration_hours,
+            "id": request_id,
+            "governor_name": governor_name,
+            "alliance_tag": alliance_tag,
+            "title_type": title_type,
+            "duration_hours": duration_hours,
         },
-        "reassigned": reassigned,
+        "reassigned": previous_status == "assigned",
     }
 
 
@@ -2278,25 +2646,23 @@ def get_title_stats(
     db: Session = Depends(get_db),
 ):
     """Get title statistics for a kingdom."""
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    kingdom_id = _kingdom_id_for_number(db, kingdom_number)
+    if kingdom_id is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
     
-    pending = db.query(TitleRequest).filter(
-        TitleRequest.kingdom_id == kingdom.id,
-        TitleRequest.status == "pending"
-    ).count()
-    
-    assigned = db.query(TitleRequest).filter(
-        TitleRequest.kingdom_id == kingdom.id,
-        TitleRequest.status == "assigned"
-    ).count()
-    
-    completed_today = db.query(TitleRequest).filter(
-        TitleRequest.kingdom_id == kingdom.id,
-        TitleRequest.status == "completed",
-        TitleRequest.completed_at >= datetime.utcnow().replace(hour=0, minute=0, second=0)
-    ).count()
+    # One pass over the kingdom's active/completed rows instead of three COUNT queries
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0)
+    pending, assigned, completed_today = db.query(
+        func.count().filter(TitleRequest.status == "pending"),
+        func.count().filter(TitleRequest.status == "assigned"),
+        func.count().filter(and_(
+            TitleRequest.status == "completed",
+            TitleRequest.completed_at >= today_start,
+        )),
+    ).filter(
+        TitleRequest.kingdom_id == kingdom_id,
+        TitleRequest.status.in_(["pending", "assigned", "completed"]),
+    ).one()
     
     return {
         "pending": pending,
@@ -2310,20 +2676,121 @@ def get_title_stats(
 # BOT COMMAND ENDPOINTS (Remote Control)
 # ============================================================
 
-# In-memory store for bot commands (in production use Redis)
-_bot_commands: Dict[int, Dict[str, Any]] = {}  # kingdom_number -> command
-_bot_status: Dict[int, Dict[str, Any]] = {}    # kingdom_number -> status
-_bot_mode: Dict[int, Dict[str, Any]] = {}      # kingdom_number -> mode config
+@dataclass(frozen=True, slots=True)
+class BotMode:
+    """What the bot of a kingdom should be doing (see set_bot_mode)."""
+    mode: str
+    scan_type: Optional[str] = None
+    scan_options: Dict[str, Any] = field(default_factory=dict)
+    updated_at: str = ""
+    requested_by: str = "website"
+
+
+class _BotState:
+    """Per-kingdom bot state (kingdom_number -> dict, or record_type instance).
+
+    Stored in a Redis hash when Redis is available, so every API worker sees the
+    same commands/mode/status and they survive restarts; each write is also
+    published on '<redis_key>:<kingdom_number>'. Without Redis it falls back to
+    a dict in this process.
+    """
+
+    def __init__(self, redis_key: str, wakes_bot: bool = True, record_type: Optional[type] = None):
+        self.redis_key = redis_key
+        self.wakes_bot = wakes_bot  # writes reset the bot's poll backoff / wake its socket
+        self.record_type = record_type  # dataclass stored as JSON object in Redis
+        self._local: Dict[int, Any] = {}
+
+    def _load(self, raw: Any) -> Any:
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        return self.record_type(**value) if self.record_type is not None else value
+
+    def get(self, kingdom_number: int) -> Any:
+        if redis_client is None:
+            return self._local.get(kingdom_number)
+        return self._load(redis_client.hget(self.redis_key, kingdom_number))
+
+    def __setitem__(self, kingdom_number: int, value: Any) -> None:
+        if redis_client is None:
+            self._local[kingdom_number] = value
+            if self.wakes_bot:
+                _bot_changed_at[kingdom_number] = time.time()
+                _notify_bot_ws(kingdom_number, self.redis_key)
+            return
+        data = json.dumps(asdict(value) if self.record_type is not None else value)
+        with redis_client.pipeline() as pipe:
+            pipe.hset(self.redis_key, kingdom_number, data)
+            if self.wakes_bot:
+                pipe.hset(_BOT_CHANGED_KEY, kingdom_number, time.time())
+            pipe.publish(f"{self.redis_key}:{kingdom_number}", data)
+            pipe.execute()
+
+    def pop(self, kingdom_number: int) -> Any:
+        if redis_client is None:
+            return self._local.pop(kingdom_number, None)
+        # HGET + HDEL in one MULTI/EXEC so two pollers can't both take a command
+        with redis_client.pipeline() as pipe:
+            pipe.hget(self.redis_key, kingdom_number)
+            pipe.hdel(self.redis_key, kingdom_number)
+            raw, _ = pipe.execute()
+        return self._load(raw)
+
+
+_bot_commands = _BotState("bot:cmd")                      # kingdom_number -> pending command
+_bot_status = _BotState("bot:status", wakes_bot=False)    # kingdom_number -> status
+_bot_mode = _BotState("bot:mode", record_type=BotMode)    # kingdom_number -> BotMode
+
+# Last command/mode change per kingdom, for the polling backoff hint
+_BOT_CHANGED_KEY = "bot:changed_at"
+_bot_changed_at: Dict[int, float] = {}
+
+# Recommended poll interval: 250 ms right after a change, doubling every 5 s
+# without one, up to 16 s
+BOT_POLL_MIN_MS = 250
+BOT_POLL_MAX_MS = 16000
+
+
+def _bot_poll_hint(response: Response, kingdom_number: int) -> int:
+    """Set Retry-After and return the next poll interval (ms) for a polling bot.
+
+    Jittered by +/-20% so bots of different kingdoms don't poll in lockstep.
+    """
+    if redis_client is None:
+        changed_at = _bot_changed_at.get(kingdom_number, 0.0)
+    else:
+        raw = redis_client.hget(_BOT_CHANGED_KEY, kingdom_number)
+        changed_at = float(raw) if raw is not None else 0.0
+    idle_steps = min(int((time.time() - changed_at) // 5), 6)
+    next_poll_ms = int(min(BOT_POLL_MAX_MS, BOT_POLL_MIN_MS * 2 ** idle_steps) * random.uniform(0.8, 1.2))
+    response.headers["Retry-After"] = str(max(1, round(next_poll_ms / 1000)))
+    return next_poll_ms
+
+
+# Accepted values, validated by FastAPI when the request is parsed (422 otherwise)
+BotCommand = Literal[
+    "start_scan",
+    "start_title_bot",
+    "stop",
+    "idle",
+    "capture_idle",
+    "get_state",
+    "recover",
+    "debug_chat",
+]
+BotScanType = Literal["kingdom", "alliance", "honor", "seed"]
+BotModeName = Literal["idle", "title_bot", "scanning", "paused"]
 
 
 @app.post("/kingdoms/{kingdom_number}/bot/command")
 def send_bot_command(
     kingdom_number: int,
-    command: str,  # "start_scan", "start_title_bot", "stop", "idle"
-    scan_type: Optional[str] = "kingdom",  # "kingdom", "alliance", "honor", "seed"
+    command: BotCommand,
+    scan_type: BotScanType = "kingdom",
     options: Optional[Dict[str, Any]] = None,
     db: Session = Depends(get_db),
-    current_kingdom: int = Depends(require_kingdom_auth),  # Require authentication
+    _=Depends(require_path_kingdom_access),  # Require authentication for this kingdom
 ):
     """Send a command to the bot for this kingdom. Requires kingdom authentication.
     
@@ -2332,84 +2799,49 @@ def send_bot_command(
     - start_title_bot: sets mode to "title_bot"
     - stop/idle: sets mode to "idle"
     """
-    # Verify user has access to this kingdom
-    if current_kingdom != kingdom_number:
-        raise HTTPException(status_code=403, detail="Access denied to this kingdom")
-    
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    if _kingdom_id_for_number(db, kingdom_number) is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
     
-    valid_commands = [
-        "start_scan",
-        "start_title_bot",
-        "stop",
-        "idle",
-        "capture_idle",
-        "get_state",
-        "recover",
-        "debug_chat",
-    ]
-    if command not in valid_commands:
-        raise HTTPException(status_code=400, detail=f"Invalid command. Must be one of: {valid_commands}")
-    
-    valid_scan_types = ["kingdom", "alliance", "honor", "seed"]
-    if scan_type not in valid_scan_types:
-        raise HTTPException(status_code=400, detail=f"Invalid scan_type. Must be one of: {valid_scan_types}")
-    
+    now_iso = datetime.utcnow().isoformat()
     _bot_commands[kingdom_number] = {
         "command": command,
         "scan_type": scan_type,
         "options": options or {},
-        "created_at": datetime.utcnow().isoformat(),
+        "created_at": now_iso,
     }
     
     # Also update the bot mode to match the command
     if command == "start_scan":
-        _bot_mode[kingdom_number] = {
-            "mode": "scanning",
-            "scan_type": scan_type,
-            "scan_options": options or {},
-            "updated_at": datetime.utcnow().isoformat(),
-            "requested_by": "website",
-        }
+        _bot_mode[kingdom_number] = BotMode("scanning", scan_type, options or {}, now_iso)
     elif command == "start_title_bot":
-        _bot_mode[kingdom_number] = {
-            "mode": "title_bot",
-            "scan_type": None,
-            "scan_options": {},
-            "updated_at": datetime.utcnow().isoformat(),
-            "requested_by": "website",
-        }
+        _bot_mode[kingdom_number] = BotMode("title_bot", updated_at=now_iso)
     elif command in ["stop", "idle"]:
-        _bot_mode[kingdom_number] = {
-            "mode": "idle",
-            "scan_type": None,
-            "scan_options": {},
-            "updated_at": datetime.utcnow().isoformat(),
-            "requested_by": "website",
-        }
+        _bot_mode[kingdom_number] = BotMode("idle", updated_at=now_iso)
     
     return {"status": "ok", "message": f"Command '{command}' sent to bot"}
 
 
 @app.get("/kingdoms/{kingdom_number}/bot/command")
-def get_bot_command(kingdom_number: int):
-    """Get pending command for bot (bot polls this endpoint)."""
-    cmd = _bot_commands.pop(kingdom_number, None)
+def get_bot_command(kingdom_number: int, response: Response):
+    """Get pending command for bot (bot polls this endpoint).
+
+    next_poll_ms / Retry-After tell the bot how long to wait before polling again.
+    """
+    cmd = _bot_commands.pop(kingdom_number)
     if cmd:
-        return {"status": "ok", "command": cmd}
-    return {"status": "no_command"}
+        response.headers["Retry-After"] = "1"
+        return {"status": "ok", "command": cmd, "next_poll_ms": BOT_POLL_MIN_MS}
+    return {"status": "no_command", "next_poll_ms": _bot_poll_hint(response, kingdom_number)}
 
 
 @app.post("/kingdoms/{kingdom_number}/bot/mode")
 def set_bot_mode(
     kingdom_number: int,
-    mode: str,  # "idle", "title_bot", "scanning", "paused"
+    mode: BotModeName,
     scan_type: Optional[str] = None,
     scan_options: Optional[Dict[str, Any]] = None,
     db: Session = Depends(get_db),
-    current_kingdom: int = Depends(require_kingdom_auth),  # Require authentication
+    _=Depends(require_path_kingdom_access),  # Require authentication for this kingdom
 ):
     """Set what the unified bot should be doing. Requires kingdom authentication.
     
@@ -2421,55 +2853,43 @@ def set_bot_mode(
     
     The bot polls this endpoint to know what mode it should be in.
     """
-    # Verify user has access to this kingdom
-    if current_kingdom != kingdom_number:
-        raise HTTPException(status_code=403, detail="Access denied to this kingdom")
-    
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    if _kingdom_id_for_number(db, kingdom_number) is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
     
-    valid_modes = ["idle", "title_bot", "scanning", "paused"]
-    if mode not in valid_modes:
-        raise HTTPException(status_code=400, detail=f"Invalid mode. Must be one of: {valid_modes}")
-    
-    _bot_mode[kingdom_number] = {
-        "mode": mode,
-        "scan_type": scan_type,
-        "scan_options": scan_options or {},
-        "updated_at": datetime.utcnow().isoformat(),
-        "requested_by": "website",
-    }
+    now_iso = datetime.utcnow().isoformat()
+    _bot_mode[kingdom_number] = BotMode(mode, scan_type, scan_options or {}, now_iso)
     
     # Also update bot status to reflect the mode change
     _bot_status[kingdom_number] = {
         "status": "navigating" if mode in ["title_bot", "scanning"] else mode,
         "message": f"Mode changed to: {mode}",
-        "updated_at": datetime.utcnow().isoformat(),
+        "updated_at": now_iso,
     }
     
     return {"status": "ok", "message": f"Bot mode set to: {mode}"}
 
 
 @app.get("/kingdoms/{kingdom_number}/bot/mode")
-def get_bot_mode(kingdom_number: int):
-    """Get current bot mode (bot polls this to know what to do)."""
-    mode_config = _bot_mode.get(kingdom_number)
-    if mode_config:
-        return {"status": "ok", "mode": mode_config}
-    # Default mode is idle - bot waits for user to select a mode
+def get_bot_mode(kingdom_number: int, response: Response):
+    """Get current bot mode (bot polls this to know what to do).
+
+    next_poll_ms / Retry-After tell the bot how long to wait before polling again.
+    """
     return {
-        "status": "ok", 
-        "mode": {
-            "mode": "idle",
-            "scan_type": None,
-            "scan_options": {},
-            "updated_at": datetime.utcnow().isoformat(),
-            "requested_by": "default",
-        }
+        "status": "ok",
+        "mode": _current_bot_mode(kingdom_number),
+        "next_poll_ms": _bot_poll_hint(response, kingdom_number),
     }
 
 
+def _current_bot_mode(kingdom_number: int) -> Dict[str, Any]:
+    mode_config = _bot_mode.get(kingdom_number)
+    if mode_config is None:
+        # Default mode is idle - bot waits for user to select a mode
+        mode_config = BotMode("idle", updated_at=datetime.utcnow().isoformat(), requested_by="default")
+    return asdict(mode_config)
+
+
 @app.post("/kingdoms/{kingdom_number}/bot/status")
 def update_bot_status(
     kingdom_number: int,
@@ -2499,147 +2919,457 @@ def get_bot_status(kingdom_number: int):
     return {"status": "ok", "bot": {"status": "offline", "message": "Bot not connected"}}
 
 
+# ------------------------------------------------------------
+# Bot WebSocket: the bot connects once and gets command/mode changes pushed,
+# instead of polling /bot/command and /bot/mode (both still work for old bots).
+# ------------------------------------------------------------
+
+BOT_WS_PING_SECONDS = 30
+# Redis relay reconnect delay: doubles after each failure up to the max
+BOT_WS_REDIS_RETRY_SECONDS = 1
+BOT_WS_REDIS_RETRY_MAX_SECONDS = 30
+
+_bot_ws_queues: Dict[int, set] = {}  # kingdom_number -> wake-up queues of open sockets
+_bot_ws_loop: Optional[asyncio.AbstractEventLoop] = None
+_bot_ws_redis_task: Optional[asyncio.Task] = None
+
+
+def _notify_bot_ws(kingdom_number: int, kind: str) -> None:
+    """Wake this kingdom's sockets; safe to call from sync endpoints' threads."""
+    queues = _bot_ws_queues.get(kingdom_number)
+    if queues and _bot_ws_loop is not None:
+        for queue in list(queues):
+            _bot_ws_loop.call_soon_threadsafe(queue.put_nowait, kind)
+
+
+async def _bot_ws_redis_listener() -> None:
+    """Relay bot:cmd/bot:mode publishes from any API worker to this worker's sockets.
+
+    One pattern subscription per process, shared by all kingdoms. Reconnects
+    with backoff when Redis goes away; sockets keep their ping loop meanwhile.
+    """
+    retry = BOT_WS_REDIS_RETRY_SECONDS
+    while True:
+        client = aioredis.Redis.from_url(REDIS_URL)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.psubscribe("bot:cmd:*", "bot:mode:*")
+            retry = BOT_WS_REDIS_RETRY_SECONDS
+            async for message in pubsub.listen():
+                if message["type"] != "pmessage":
+                    continue
+                kind, _, kingdom = message["channel"].decode().rpartition(":")
+                if not kingdom.isdigit():
+                    logger.debug(f"Ignoring bot publish on malformed channel {message['channel']!r}")
+                    continue
+                _notify_bot_ws(int(kingdom), kind)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Bot WebSocket Redis relay lost ({e}); reconnecting in {retry}s")
+        finally:
+            try:
+                await pubsub.close()
+                await client.close()
+            except Exception:
+                pass
+        await asyncio.sleep(retry)
+        retry = min(retry * 2, BOT_WS_REDIS_RETRY_MAX_SECONDS)
+
+
+def _bot_ws_allowed(websocket: WebSocket) -> bool:
+    """Same rule as require_bot_access: localhost or the X-Bot-Key header.
+
+    Not accepted as a query parameter, which would put the key in access logs.
+    """
+    client_host = websocket.client.host if websocket.client else ""
+    return client_host in LOCAL_HOSTS or websocket.headers.get("x-bot-key") == BOT_API_KEY
+
+
+@app.websocket("/kingdoms/{kingdom_number}/bot/ws")
+async def bot_websocket(websocket: WebSocket, kingdom_number: int):
+    """Push channel for the bot.
+
+    Sends {"type": "mode", ...} on connect and on every mode change, and
+    {"type": "command", ...} for each command (same bodies as the polling
+    endpoints). A command is delivered once, to one connection. Sends
+    {"type": "ping"} when idle so dead connections are noticed.
+    """
+    global _bot_ws_loop, _bot_ws_redis_task
+    if not _bot_ws_allowed(websocket):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    
+    _bot_ws_loop = asyncio.get_running_loop()
+    if redis_client is not None and (_bot_ws_redis_task is None or _bot_ws_redis_task.done()):
+        _bot_ws_redis_task = asyncio.create_task(_bot_ws_redis_listener())
+    
+    queue: asyncio.Queue = asyncio.Queue()
+    _bot_ws_queues.setdefault(kingdom_number, set()).add(queue)
+    try:
+        mode_config = await run_in_threadpool(_current_bot_mode, kingdom_number)
+        await websocket.send_json({"type": "mode", "status": "ok", "mode": mode_config})
+        queue.put_nowait("bot:cmd")  # deliver a command queued before connecting
+        while True:
+            try:
+                kind = await asyncio.wait_for(queue.get(), timeout=BOT_WS_PING_SECONDS)
+            except asyncio.TimeoutError:
+                await websocket.send_json({"type": "ping"})
+                continue
+            if kind == "bot:cmd":
+                cmd = await run_in_threadpool(_bot_commands.pop, kingdom_number)
+                if cmd:
+                    await websocket.send_json({"type": "command", "status": "ok", "command": cmd})
+            elif kind == "bot:mode":
+                mode_config = await run_in_threadpool(_current_bot_mode, kingdom_number)
+                await websocket.send_json({"type": "mode", "status": "ok", "mode": mode_config})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        queues = _bot_ws_queues.get(kingdom_number)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                _bot_ws_queues.pop(kingdom_number, None)
+
+
 # In-memory buffer for governor uploads from bot
-_bot_governor_buffer: Dict[int, List[Dict[str, Any]]] = {}  # kingdom_number -> list of governors
+_bot_governor_buffer: Dict[int, Deque[Dict[str, Any]]] = {}  # kingdom_number -> buffered governors
+_bot_governor_buffer_since: Dict[int, float] = {}             # kingdom_number -> first buffered at
+# Uploads and flushes run in worker threads; a flush swaps the whole buffer out
+# under this lock so no concurrent upload is lost between reading and clearing it
+_bot_governor_buffer_lock = threading.Lock()
+
+# A buffer is written once it holds this many governors, or (checked every few
+# seconds) once its oldest entry is this old, so a half-full buffer isn't kept forever
+GOVERNOR_BUFFER_FLUSH_SIZE = 50
+GOVERNOR_BUFFER_MAX_AGE_SECONDS = 30
+GOVERNOR_BUFFER_CHECK_SECONDS = 5
+# Hard cap per kingdom. A failed flush puts its governors back on the buffer, so
+# while flushes keep failing it grows up to here; beyond it the oldest governors
+# are dropped and logged
+GOVERNOR_BUFFER_MAX_SIZE = 500
+
+# Optional folder keeping the raw governor batches written by each flush
+BOT_SCAN_ARCHIVE_DIR = os.getenv("BOT_SCAN_ARCHIVE_DIR")
+
+
+def _governor_flush_threshold(kingdom_number: int) -> int:
+    """GOVERNOR_BUFFER_FLUSH_SIZE +/- 5, fixed per kingdom, so bots scanning at the
+    same pace don't all flush at the same moment."""
+    return GOVERNOR_BUFFER_FLUSH_SIZE + (kingdom_number * 2654435761 >> 8) % 11 - 5
+
+# Buffered governors dropped at flush time because their data was unusable
+_bot_governor_rejected = 0
+# Buffered governors pushed out of a full buffer before they could be written
+_bot_governor_overflowed = 0
+
+# Thousands separators the bot OCR reports, as '1,234' or '1.234'
+_THOUSANDS_SEPARATORS = str.maketrans("", "", ",.")
+
+
+def _safe_int(val) -> int:
+    """Parse a bot-reported number, 0 when missing or unreadable."""
+    if val is None or val == "" or val == "-":
+        return 0
+    if type(val) is int:
+        return val
+    try:
+        return int(str(val).translate(_THOUSANDS_SEPARATORS))
+    except ValueError:
+        return 0
 
 
 @app.post("/kingdoms/{kingdom_number}/bot/governor")
 def upload_governor_from_bot(
     kingdom_number: int,
+    background_tasks: BackgroundTasks,
     governor_data: Dict[str, Any] = Body(...),
     db: Session = Depends(get_db),
     _=Depends(require_bot_access),  # Require bot access
 ):
     """
     Upload a single governor scan result from the bot. Requires bot access.
-    The bot calls this endpoint for each governor scanned.
+    The bot calls this endpoint for each governor scanned; full buffers are
+    written after the response is sent.
     """
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    global _bot_governor_overflowed
+    if _kingdom_id_for_number(db, kingdom_number) is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
     
     # Buffer the governor data
-    if kingdom_number not in _bot_governor_buffer:
-        _bot_governor_buffer[kingdom_number] = []
-    
-    _bot_governor_buffer[kingdom_number].append({
+    entry = {
         **governor_data,
         "timestamp": datetime.utcnow().isoformat(),
-    })
+    }
+    with _bot_governor_buffer_lock:
+        buffer = _bot_governor_buffer.get(kingdom_number)
+        if buffer is None:
+            buffer = _bot_governor_buffer[kingdom_number] = deque(maxlen=GOVERNOR_BUFFER_MAX_SIZE)
+            _bot_governor_buffer_since[kingdom_number] = time.time()
+        dropped = buffer[0] if len(buffer) == buffer.maxlen else None
+        buffer.append(entry)
+        buffered = len(buffer)
+        if dropped is not None:
+            _bot_governor_overflowed += 1
+    
+    if dropped is not None:
+        logger.warning(
+            "Governor buffer for kingdom %s is full (%d); dropped governor %r (%d dropped since startup)",
+            kingdom_number, GOVERNOR_BUFFER_MAX_SIZE, dropped.get("ID"), _bot_governor_overflowed,
+        )
     
-    # If buffer reaches 50 governors, flush to database
-    if len(_bot_governor_buffer[kingdom_number]) >= 50:
-        _flush_governor_buffer(kingdom_number, db)
+    # If buffer is full, flush to database without holding up this response
+    if buffered >= _governor_flush_threshold(kingdom_number):
+        background_tasks.add_task(_flush_governor_buffer_in_new_session, kingdom_number)
     
-    return {"status": "ok", "buffered": len(_bot_governor_buffer.get(kingdom_number, []))}
+    return {"status": "ok", "buffered": buffered}
 
 
 @app.post("/kingdoms/{kingdom_number}/bot/flush")
-def flush_governor_buffer(
-    kingdom_number: int,
-    db: Session = Depends(get_db),
-):
+def flush_governor_buffer(kingdom_number: int):
     """Flush buffered governors to the database."""
-    count = _flush_governor_buffer(kingdom_number, db)
+    # Bots call this opportunistically; don't check out a session for an empty buffer
+    if not _bot_governor_buffer.get(kingdom_number):
+        return {"status": "ok", "saved": 0}
+    db = SessionLocal()
+    try:
+        count = _flush_governor_buffer(kingdom_number, db)
+    finally:
+        db.close()
     return {"status": "ok", "saved": count}
 
 
+def _archive_bot_scan(governors: List[Dict[str, Any]], source_file: str) -> str:
+    """Best-effort gzip copy of a raw bot batch in BOT_SCAN_ARCHIVE_DIR.
+
+    Returns the archived file name (source_file + '.gz'), or source_file when
+    archiving is off or fails.
+    """
+    if not BOT_SCAN_ARCHIVE_DIR:
+        return source_file
+    archive_name = f"{source_file}.gz"
+    try:
+        os.makedirs(BOT_SCAN_ARCHIVE_DIR, exist_ok=True)
+        # Level 1: scan batches compress well even at the fastest setting
+        with gzip.open(os.path.join(BOT_SCAN_ARCHIVE_DIR, archive_name), "wb", compresslevel=1) as f:
+            f.write(orjson.dumps(governors))
+        return archive_name
+    except Exception as e:
+        logger.warning(f"Could not archive bot scan {archive_name}: {e}")
+        return source_file
+
+
 def _flush_governor_buffer(kingdom_number: int, db: Session) -> int:
-    """Internal function to flush governor buffer to database."""
+    """Internal function to flush governor buffer to database.
+
+    The buffer is taken before the write so uploads can keep buffering meanwhile;
+    if the write fails, the batch goes back on the buffer for the next flush.
+    """
     if kingdom_number not in _bot_governor_buffer or not _bot_governor_buffer[kingdom_number]:
         return 0
     
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    kingdom_id = _kingdom_id_for_number(db, kingdom_number)
+    if kingdom_id is None:
         return 0
     
-    governors = _bot_governor_buffer.pop(kingdom_number, [])
-    count = 0
-    
-    # Create a single ingest file for this batch
-    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-    ingest_file = IngestFile(
-        scan_type="bot_scan",
-        source_file=f"bot_scan_{kingdom_number}_{timestamp}.json",
-        record_count=len(governors),
-    )
-    db.add(ingest_file)
-    db.flush()
+    with _bot_governor_buffer_lock:
+        buffer = _bot_governor_buffer.pop(kingdom_number, None)
+        since = _bot_governor_buffer_since.pop(kingdom_number, None)
+    if not buffer:
+        return 0
+    governors = list(buffer)
+    try:
+        return _write_governor_batch(kingdom_number, kingdom_id, governors, db)
+    except Exception:
+        db.rollback()
+        _requeue_governors(kingdom_number, governors, since)
+        raise
+
+
+def _requeue_governors(kingdom_number: int, governors: List[Dict[str, Any]], since: Optional[float]) -> None:
+    """Put a batch whose write failed back in front of anything buffered since."""
+    global _bot_governor_overflowed
+    with _bot_governor_buffer_lock:
+        newer = _bot_governor_buffer.get(kingdom_number, ())
+        merged = [*governors, *newer]
+        _bot_governor_buffer[kingdom_number] = deque(merged, maxlen=GOVERNOR_BUFFER_MAX_SIZE)
+        _bot_governor_buffer_since[kingdom_number] = since or time.time()
+        dropped = max(0, len(merged) - GOVERNOR_BUFFER_MAX_SIZE)
+        _bot_governor_overflowed += dropped
+    if dropped:
+        logger.warning(
+            "Governor buffer for kingdom %s is full (%d); dropped %d governors after a failed flush "
+            "(%d dropped since startup)",
+            kingdom_number, GOVERNOR_BUFFER_MAX_SIZE, dropped, _bot_governor_overflowed,
+        )
+
+
+def _write_governor_batch(kingdom_number: int, kingdom_id: int, governors: List[Dict[str, Any]], db: Session) -> int:
+    """Write one flushed batch in a single transaction; returns the snapshots written."""
+    global _bot_governor_rejected
+    
+    # Create a single ingest file for this batch. Several flushes of one kingdom
+    # can land in the same second (threshold, timer, shutdown, /bot/flush), and
+    # (scan_type, source_file) is unique, so the name carries microseconds
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')
+    source_file = _archive_bot_scan(governors, f"bot_scan_{kingdom_number}_{timestamp}.json")
+    ingest_file_id = db.execute(
+        insert(IngestFile)
+        .values(
+            scan_type="bot_scan",
+            source_file=source_file,
+            record_count=len(governors),
+        )
+        .returning(IngestFile.id)
+    ).scalar_one()
     
+    # Validate the batch first, then resolve alliances and governors with one
+    # query each instead of several round trips per governor
+    rows = []
     for gov_data in governors:
         try:
             gov_id = int(gov_data.get("ID") or 0)
             if not gov_id:
                 continue
-            
-            # Handle alliance
-            alliance = None
             alliance_name = gov_data.get("Alliance", "").strip()
-            if alliance_name and alliance_name != "-":
-                alliance = (
-                    db.query(Alliance)
-                    .filter_by(name=alliance_name, kingdom_id=kingdom.id)
-                    .first()
-                )
-                if not alliance:
-                    alliance = Alliance(
-                        name=alliance_name,
-                        tag=alliance_name[:10],
-                        kingdom_id=kingdom.id,
-                    )
-                    db.add(alliance)
-                    db.flush()
-            
-            # Get or create governor
-            governor = db.query(Governor).filter_by(governor_id=gov_id).first()
-            if not governor:
-                governor = Governor(
-                    governor_id=gov_id,
-                    name=gov_data.get("Name", ""),
-                    kingdom_id=kingdom.id,
-                    alliance_id=alliance.id if alliance else None,
-                )
-                db.add(governor)
-                db.flush()
-            else:
-                governor.name = gov_data.get("Name", governor.name)
-                if alliance:
-                    governor.alliance_id = alliance.id
-                db.add(governor)
-            
-            # Create snapshot
-            def safe_int(val):
-                try:
-                    if val is None or val == "" or val == "-":
-                        return 0
-                    return int(str(val).replace(",", "").replace(".", ""))
-                except:
-                    return 0
-            
-            snapshot = GovernorSnapshot(
-                governor_id_fk=governor.id,
-                ingest_file_id=ingest_file.id,
-                power=safe_int(gov_data.get("Power")),
-                kill_points=safe_int(gov_data.get("Killpoints")),
-                t1_kills=safe_int(gov_data.get("T1 Kills")),
-                t2_kills=safe_int(gov_data.get("T2 Kills")),
-                t3_kills=safe_int(gov_data.get("T3 Kills")),
-                t4_kills=safe_int(gov_data.get("T4 Kills")),
-                t5_kills=safe_int(gov_data.get("T5 Kills")),
-                dead=safe_int(gov_data.get("Deads")),
-                rss_gathered=safe_int(gov_data.get("Rss Gathered")),
-                rss_assistance=safe_int(gov_data.get("Rss Assistance")),
-                helps=safe_int(gov_data.get("Helps")),
-            )
-            db.add(snapshot)
-            count += 1
-            
+            if alliance_name == "-":
+                alliance_name = ""
+            rows.append((gov_id, alliance_name, gov_data))
         except Exception as e:
-            print(f"Error processing governor: {e}")
+            _bot_governor_rejected += 1
+            logger.warning(
+                "Skipping bot governor %r for kingdom %s: %s (%d rejected since startup)",
+                gov_data.get("ID"), kingdom_number, e, _bot_governor_rejected,
+            )
             continue
     
+    if not rows:
+        db.commit()
+        return 0
+    
+    # Get or create alliances (new ids come back from INSERT ... RETURNING)
+    alliance_names = {alliance_name for _, alliance_name, _ in rows if alliance_name}
+    alliance_ids: Dict[str, int] = {}
+    if alliance_names:
+        alliance_ids = dict(
+            db.query(Alliance.name, Alliance.id)
+            .filter(Alliance.kingdom_id == kingdom_id, Alliance.name.in_(alliance_names))
+            .all()
+        )
+        missing = sorted(alliance_names - alliance_ids.keys())
+        if missing:
+            alliance_ids.update(
+                db.execute(
+                    insert(Alliance).returning(Alliance.name, Alliance.id),
+                    [{"name": name, "tag": name[:10], "kingdom_id": kingdom_id} for name in missing],
+                ).all()
+            )
+    
+    # Final name/alliance per governor (later entries in the batch win)
+    existing = {
+        gov_id: (pk, name, alliance_id)
+        for gov_id, pk, name, alliance_id in db.execute(
+            _GOVERNOR_STATE_BY_ID,
+            {"governor_ids": list({gov_id for gov_id, _, _ in rows})},
+        )
+    }
+    state: Dict[int, Dict[str, Any]] = {}
+    for gov_id, alliance_name, gov_data in rows:
+        alliance_id = alliance_ids.get(alliance_name) if alliance_name else None
+        current = state.get(gov_id)
+        if current is None:
+            if gov_id in existing:
+                pk, name, old_alliance_id = existing[gov_id]
+                current = {"id": pk, "name": gov_data.get("Name", name), "alliance_id": old_alliance_id}
+            else:
+                current = {"id": None, "name": gov_data.get("Name", ""), "alliance_id": None}
+            state[gov_id] = current
+        else:
+            current["name"] = gov_data.get("Name", current["name"])
+        if alliance_id:
+            current["alliance_id"] = alliance_id
+    
+    # New governors with INSERT ... RETURNING, existing ones with a bulk UPDATE by primary key
+    new_governors = [
+        {"governor_id": gov_id, "name": g["name"], "kingdom_id": kingdom_id, "alliance_id": g["alliance_id"]}
+        for gov_id, g in state.items() if g["id"] is None
+    ]
+    if new_governors:
+        for gov_id, pk in db.execute(
+            insert(Governor).returning(Governor.governor_id, Governor.id), new_governors
+        ):
+            state[gov_id]["id"] = pk
+    updated_governors = [g for gov_id, g in state.items() if gov_id in existing]
+    if updated_governors:
+        db.execute(update(Governor), updated_governors)
+    
+    # Snapshots in one executemany
+    snapshot_rows = [
+        {
+            "governor_id_fk": state[gov_id]["id"],
+            "ingest_file_id": ingest_file_id,
+            "power": _safe_int(gov_data.get("Power")),
+            "kill_points": _safe_int(gov_data.get("Killpoints")),
+            "t1_kills": _safe_int(gov_data.get("T1 Kills")),
+            "t2_kills": _safe_int(gov_data.get("T2 Kills")),
+            "t3_kills": _safe_int(gov_data.get("T3 Kills")),
+            "t4_kills": _safe_int(gov_data.get("T4 Kills")),
+            "t5_kills": _safe_int(gov_data.get("T5 Kills")),
+            "dead": _safe_int(gov_data.get("Deads")),
+            "rss_gathered": _safe_int(gov_data.get("Rss Gathered")),
+            "rss_assistance": _safe_int(gov_data.get("Rss Assistance")),
+            "helps": _safe_int(gov_data.get("Helps")),
+        }
+        for gov_id, _, gov_data in rows
+    ]
+    db.execute(insert(GovernorSnapshot), snapshot_rows)
+    
+    # Everything above is one transaction, committed once
     db.commit()
-    return count
+    return len(snapshot_rows)
+
+
+def _flush_governor_buffer_in_new_session(kingdom_number: int) -> int:
+    """Flush outside a request (background task / timer), with its own session."""
+    db = SessionLocal()
+    try:
+        return _flush_governor_buffer(kingdom_number, db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Governor buffer flush failed for kingdom {kingdom_number}: {e}")
+        return 0
+    finally:
+        db.close()
+
+
+async def _flush_stale_governor_buffers() -> None:
+    """Write buffers whose oldest governor has waited GOVERNOR_BUFFER_MAX_AGE_SECONDS."""
+    while True:
+        await asyncio.sleep(GOVERNOR_BUFFER_CHECK_SECONDS)
+        stale_before = time.time() - GOVERNOR_BUFFER_MAX_AGE_SECONDS
+        for kingdom_number, since in list(_bot_governor_buffer_since.items()):
+            if since <= stale_before:
+                await run_in_threadpool(_flush_governor_buffer_in_new_session, kingdom_number)
+
+
+_governor_flush_task: Optional[asyncio.Task] = None
+
+
+@app.on_event("startup")
+async def start_governor_buffer_timer():
+    global _governor_flush_task
+    _governor_flush_task = asyncio.create_task(_flush_stale_governor_buffers())
+
+
+@app.on_event("shutdown")
+def flush_governor_buffers_on_shutdown():
+    """Stop the timer and write whatever is still buffered."""
+    if _governor_flush_task is not None:
+        _governor_flush_task.cancel()
+    for kingdom_number in list(_bot_governor_buffer):
+        _flush_governor_buffer_in_new_session(kingdom_number)
 
 
 # Initialize default admin on startup
@@ -2672,31 +3402,38 @@ def get_linked_accounts(
     db: Session = Depends(get_db),
 ):
     """Get all accounts linked to this governor (main + farms)."""
-    from .models import LinkedAccount
     
-    # Find all links where this governor is either main or linked
-    links_as_main = db.query(LinkedAccount).filter_by(main_governor_id=governor_id).all()
-    links_as_linked = db.query(LinkedAccount).filter_by(linked_governor_id=governor_id).all()
+    # Find all links where this governor is either main or linked (one query)
+    links = (
+        db.query(LinkedAccount)
+        .filter(or_(
+            LinkedAccount.main_governor_id == governor_id,
+            LinkedAccount.linked_governor_id == governor_id,
+        ))
+        .order_by(LinkedAccount.id)
+        .all()
+    )
     
     linked = []
-    
-    # Add all linked accounts (this gov is main)
-    for link in links_as_main:
-        linked.append({
-            "governor_id": link.linked_governor_id,
-            "governor_name": link.linked_governor_name,
-            "is_main": False,
-            "verified": link.verified,
-        })
-    
-    # Add the main account (this gov is a farm)
-    for link in links_as_linked:
-        linked.append({
-            "governor_id": link.main_governor_id,
-            "governor_name": link.main_governor_name,
-            "is_main": True,
-            "verified": link.verified,
-        })
+    mains = []
+    for link in links:
+        if link.main_governor_id == governor_id:
+            # Linked account (this gov is main)
+            linked.append({
+                "governor_id": link.linked_governor_id,
+                "governor_name": link.linked_governor_name,
+                "is_main": False,
+                "verified": link.verified,
+            })
+        else:
+            # The main account (this gov is a farm)
+            mains.append({
+                "governor_id": link.main_governor_id,
+                "governor_name": link.main_governor_name,
+                "is_main": True,
+                "verified": link.verified,
+            })
+    linked.extend(mains)
     
     return {"governor_id": governor_id, "linked_accounts": linked}
 
@@ -2711,7 +3448,6 @@ def add_linked_account(
     db: Session = Depends(get_db),
 ):
     """Link two accounts together (main + farm)."""
-    from .models import LinkedAccount
     
     kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
     
@@ -2755,7 +3491,6 @@ def remove_linked_account(
     db: Session = Depends(get_db),
 ):
     """Remove a linked account."""
-    from .models import LinkedAccount
     
     link = db.query(LinkedAccount).filter_by(id=link_id).first()
     if not link:
@@ -2778,7 +3513,6 @@ def get_player_location(
     db: Session = Depends(get_db),
 ):
     """Get cached location of a player."""
-    from .models import PlayerLocation
     
     kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
     if not kingdom:
@@ -2814,34 +3548,29 @@ def update_player_location(
     db: Session = Depends(get_db),
 ):
     """Update/cache a player's location (called by title bot after finding them)."""
-    from .models import PlayerLocation
     
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    kingdom_id = _kingdom_id_for_number(db, kingdom_number)
+    if kingdom_id is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
     
-    # Upsert location
-    location = db.query(PlayerLocation).filter_by(
-        governor_id=governor_id,
-        kingdom_id=kingdom.id
-    ).first()
-    
-    if location:
-        location.x_coord = x  # type: ignore
-        location.y_coord = y  # type: ignore
-        location.shield_type = shield_type  # type: ignore
-        if governor_name:
-            location.governor_name = governor_name  # type: ignore
-    else:
-        location = PlayerLocation(
+    # Upsert location in one statement (unique on governor_id + kingdom_id)
+    now = datetime.utcnow()
+    changes = {"x_coord": x, "y_coord": y, "shield_type": shield_type, "updated_at": now}
+    if governor_name:
+        changes["governor_name"] = governor_name
+    db.execute(
+        _dialect_insert(PlayerLocation)
+        .values(
             governor_id=governor_id,
             governor_name=governor_name,
-            kingdom_id=kingdom.id,
+            kingdom_id=kingdom_id,
             x_coord=x,
             y_coord=y,
             shield_type=shield_type,
+            updated_at=now,
         )
-        db.add(location)
+        .on_conflict_do_update(index_elements=["governor_id", "kingdom_id"], set_=changes)
+    )
     
     db.commit()
     
@@ -2858,8 +3587,7 @@ def request_find_player(
     Request the bot to find a player's location.
     The bot will scan the map and report back the location.
     """
-    kingdom = db.query(Kingdom).filter_by(number=kingdom_number).first()
-    if not kingdom:
+    if _kingdom_id_for_number(db, kingdom_number) is None:
         raise HTTPException(status_code=404, detail="Kingdom not found")
     
     # Add a special command for the bot
@@ -9,7 +9,11 @@ from sqlalchemy import (
     UniqueConstraint,
     Numeric,
     Boolean,
+    Index,
+    JSON,
 )
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
 from .database import Base
@@ -42,6 +46,23 @@ class IngestFile(Base):
     snapshots = relationship("GovernorSnapshot", back_populates="ingest_file")
 
 
+class IngestManifest(Base):
+    """Content hash of every scan CSV imported from the server folder.
+
+    The only re-import skip check: a file whose (filename, sha256) is recorded
+    here is neither parsed nor ingested again.
+    """
+    __tablename__ = "ingest_manifest"
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String(255), nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    ingested_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("filename", "sha256", name="uq_ingest_manifest_file"),
+    )
+
+
 class Kingdom(Base):
     __tablename__ = "kingdoms"
     id = Column(Integer, primary_key=True, index=True)
@@ -67,6 +88,9 @@ class Alliance(Base):
     kingdom = relationship("Kingdom", back_populates="alliances")
     governors = relationship("Governor", back_populates="alliance")
 
+    # Alliance lookups by name within a kingdom (ingest and bot buffer flush)
+    __table_args__ = (Index("ix_alliances_kingdom_name", "kingdom_id", "name"),)
+
 
 class Governor(Base):
     __tablename__ = "governors"
@@ -86,7 +110,7 @@ class Governor(Base):
 class DKPRule(Base):
     __tablename__ = "dkp_rules"
     id = Column(Integer, primary_key=True, index=True)
-    kingdom_id = Column(Integer, ForeignKey("kingdoms.id"), nullable=False)
+    kingdom_id = Column(Integer, ForeignKey("kingdoms.id"), nullable=False, index=True)
     dkp_enabled = Column(Boolean, default=True)  # Master switch for DKP tracking
     weight_t4 = Column(Numeric(10, 2), default=2)  # Default: T4 = 2 pts
     weight_t5 = Column(Numeric(10, 2), default=4)  # Default: T5 = 4 pts
@@ -95,7 +119,8 @@ class DKPRule(Base):
     dkp_goal = Column(BigInteger, default=0)  # Legacy single goal (fallback)
     # JSON array of power tiers with kills_goal, dead_goal, power_coeff
     # Example: [{"min_power": 5000000, "max_power": 10000000, "kills_goal": 288750, "dead_goal": 45000, "power_coeff": 0.19}, ...]
-    power_tiers = Column(String(4000), nullable=True)  # JSON string (larger for more tiers)
+    # JSONB on PostgreSQL (decoded by the driver), JSON text on SQLite
+    power_tiers = Column(JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"), nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     kingdom = relationship("Kingdom", backref="dkp_rules")
@@ -105,8 +130,8 @@ class GovernorSnapshot(Base):
     __tablename__ = "governor_snapshots"
     id = Column(Integer, primary_key=True, index=True)
     governor_id_fk = Column(Integer, ForeignKey("governors.id"))
-    ingest_file_id = Column(Integer, ForeignKey("ingest_files.id"), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    ingest_file_id = Column(Integer, ForeignKey("ingest_files.id"), nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     power = Column(BigInteger, default=0)
     kill_points = Column(BigInteger, default=0)
@@ -124,6 +149,14 @@ class GovernorSnapshot(Base):
     ingest_file = relationship("IngestFile", back_populates="snapshots")
 
 
+# Latest/first snapshot per governor (MAX(created_at) per governor_id_fk,
+# ROW_NUMBER() OVER (PARTITION BY governor_id_fk ORDER BY created_at)) read the index in order
+Index(
+    "ix_governor_snapshots_governor_created",
+    GovernorSnapshot.governor_id_fk, GovernorSnapshot.created_at.desc(),
+)
+
+
 class GovernorNameHistory(Base):
     """Tracks name changes for governors."""
     __tablename__ = "governor_name_history"
@@ -167,6 +200,29 @@ class TitleRequest(Base):
     
     kingdom = relationship("Kingdom", backref="title_requests")
 
+    __table_args__ = (
+        # Covers the queue-position count (kingdom + status, ids up to the new request)
+        Index("ix_title_requests_kingdom_status_id", "kingdom_id", "status", "id"),
+    )
+
+
+# At most one active (pending/assigned) request per requester and title.
+# Requests without a resolved governor_id are deduped by name instead.
+Index(
+    "uq_title_requests_active_governor",
+    TitleRequest.kingdom_id, TitleRequest.title_type, TitleRequest.governor_id,
+    unique=True,
+    postgresql_where=(TitleRequest.governor_id > 0) & TitleRequest.status.in_(["pending", "assigned"]),
+    sqlite_where=(TitleRequest.governor_id > 0) & TitleRequest.status.in_(["pending", "assigned"]),
+)
+Index(
+    "uq_title_requests_active_name",
+    TitleRequest.kingdom_id, TitleRequest.title_type, func.lower(TitleRequest.governor_name),
+    unique=True,
+    postgresql_where=(TitleRequest.governor_id == 0) & TitleRequest.status.in_(["pending", "assigned"]),
+    sqlite_where=(TitleRequest.governor_id == 0) & TitleRequest.status.in_(["pending", "assigned"]),
+)
+
 
 class TitleBotSettings(Base):
     """Per-kingdom settings for the title bot UI/automation."""
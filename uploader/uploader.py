@@ -1,34 +1,123 @@
+import hashlib
 import json
 import os
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import requests
 
+try:
+    import orjson
+
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:  # stdlib json works too, just slower
+    def _loads(line: bytes):
+        return json.loads(line)
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # without watchdog the folder is only polled, every ROK_POLL_SECONDS
+    FileSystemEventHandler = object
+    Observer = None
+
 API_URL = os.getenv("ROK_API_URL", "http://localhost:8000/ingest/roktracker")
 API_TOKEN = os.getenv("INGEST_TOKEN")
 SCAN_FOLDER = Path(os.getenv("ROK_SCAN_FOLDER", r"C:\\RokTracker\\scans-kingdom"))
 POLL_INTERVAL_SECONDS = int(os.getenv("ROK_POLL_SECONDS", "10"))
+# With watchdog, the folder is still rescanned this often so failed uploads are retried
+RESCAN_INTERVAL_SECONDS = int(os.getenv("ROK_RESCAN_SECONDS", "60"))
+UPLOAD_WORKERS = int(os.getenv("ROK_UPLOAD_WORKERS", "4"))
+# A new file is uploaded once its size has not changed for this long
+SETTLE_SECONDS = 1.0
 
 # Kingdom number - auto-detect from filename if not set
 _rok_kingdom_env = os.getenv("ROK_KINGDOM", "").strip()
 KINGDOM_NUMBER = int(_rok_kingdom_env) if _rok_kingdom_env else None  # None = extract from filename
 
-import re
+# One keep-alive session per upload thread instead of a new connection per file
+# (requests.Session isn't safe to share between threads)
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+# Kingdom in scan filenames: a 4-digit number right before the '-[id]' suffix,
+# else the first 4-digit number
+_KINGDOM_RE = re.compile(r'-(\d{4})-\[')
+_FALLBACK_KINGDOM_RE = re.compile(r'(\d{4})')
+
 
 def extract_kingdom_from_filename(filename: str) -> int:
     """Extract kingdom number from filename like 'TOP250-2025-12-29-3328-[gs1dp0ow].csv'"""
     # Pattern: look for a 4-digit number that could be a kingdom (usually after date)
-    match = re.search(r'-(\d{4})-\[', filename)
+    match = _KINGDOM_RE.search(filename)
     if match:
         return int(match.group(1))
     # Fallback: any 4-digit number
-    match = re.search(r'(\d{4})', filename)
+    match = _FALLBACK_KINGDOM_RE.search(filename)
     if match:
         return int(match.group(1))
     return 3328  # Default fallback
 
 
+def _file_sha256(path: Path) -> str:
+    """SHA-256 of the file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while block := f.read(1 << 20):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _iter_records(path: Path, kingdom: int):
+    """Yield the ingest records of a JSONL scan file, one line at a time."""
+    with path.open("rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            data = _loads(line)
+            yield {
+                "kingdom": kingdom,
+                "governor_id": data["governor_id"],
+                "governor_name": data["governor_name"],
+                "alliance_name": data.get("alliance_name"),
+                "power": data["power"],
+                "kill_points": data["kill_points"],
+                "t1_kills": data.get("t1_kills", 0),
+                "t2_kills": data.get("t2_kills", 0),
+                "t3_kills": data.get("t3_kills", 0),
+                "t4_kills": data.get("t4_kills", 0),
+                "t5_kills": data.get("t5_kills", 0),
+                "dead": data.get("dead", 0),
+                "rss_gathered": data.get("rss_gathered", 0),
+                "rss_assistance": data.get("rss_assistance", 0),
+                "helps": data.get("helps", 0),
+            }
+
+
+def _iter_payload(path: Path, kingdom: int):
+    """Yield the JSON body {"scan_type", "source_file", "ingest_hash", "records"} in pieces."""
+    # The file's own digest lets the server skip a re-upload of the same scan
+    head = _dumps({"scan_type": "kingdom", "source_file": path.name, "ingest_hash": _file_sha256(path)})
+    yield head[:-1] + b',"records":['
+    for i, record in enumerate(_iter_records(path, kingdom)):
+        yield (b"," if i else b"") + _dumps(record)
+    yield b"]}"
+
+
 def process_file(path: Path):
     # Determine kingdom number
     kingdom = KINGDOM_NUMBER
@@ -36,59 +125,102 @@ def process_file(path: Path):
         kingdom = extract_kingdom_from_filename(path.name)
         print(f"  Auto-detected kingdom: {kingdom} from filename")
     
-    records = []
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            data = json.loads(line)
-            records.append(
-                {
-                    "kingdom": kingdom,
-                    "governor_id": data["governor_id"],
-                    "governor_name": data["governor_name"],
-                    "alliance_name": data.get("alliance_name"),
-                    "power": data["power"],
-                    "kill_points": data["kill_points"],
-                    "t1_kills": data.get("t1_kills", 0),
-                    "t2_kills": data.get("t2_kills", 0),
-                    "t3_kills": data.get("t3_kills", 0),
-                    "t4_kills": data.get("t4_kills", 0),
-                    "t5_kills": data.get("t5_kills", 0),
-                    "dead": data.get("dead", 0),
-                    "rss_gathered": data.get("rss_gathered", 0),
-                    "rss_assistance": data.get("rss_assistance", 0),
-                    "helps": data.get("helps", 0),
-                }
-            )
-
-    payload = {
-        "scan_type": "kingdom",
-        "source_file": path.name,
-        "records": records,
-    }
-
-    headers = {"x-api-key": API_TOKEN} if API_TOKEN else None
-    resp = requests.post(API_URL, json=payload, headers=headers, timeout=60)
+    headers = {"Content-Type": "application/json"}
+    if API_TOKEN:
+        headers["x-api-key"] = API_TOKEN
+    # The body is streamed (chunked) from the file, so only one record is in memory at a time
+    resp = _session().post(API_URL, data=_iter_payload(path, kingdom), headers=headers, timeout=60)
     print(f"Uploaded {path.name}: {resp.status_code} {resp.text}")
+    # Server-side failures keep the file as .jsonl, so the next rescan retries it
+    if resp.status_code >= 500:
+        resp.raise_for_status()
 
     done_path = path.with_suffix(path.suffix + ".done")
     path.rename(done_path)
 
 
+# Files queued or uploading, so repeated events for one file upload it once
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _wait_until_written(path: Path) -> bool:
+    """Wait for the scanner to finish writing the file; False if it went away."""
+    size = -1
+    while True:
+        try:
+            current = path.stat().st_size
+        except FileNotFoundError:
+            return False
+        if current == size:
+            return True
+        size = current
+        time.sleep(SETTLE_SECONDS)
+
+
+def _upload(path: Path):
+    try:
+        if _wait_until_written(path):
+            process_file(path)
+    except Exception as exc:  # pylint: disable=broad-except
+        print(f"Error processing {path.name}: {exc}")
+    finally:
+        with _pending_lock:
+            _pending.discard(path)
+
+
+def _submit(executor: ThreadPoolExecutor, path: Path):
+    if path.suffix != ".jsonl":
+        return
+    with _pending_lock:
+        if path in _pending:
+            return
+        _pending.add(path)
+    executor.submit(_upload, path)
+
+
+class _ScanFolderHandler(FileSystemEventHandler):
+    """Queue an upload for every .jsonl file created in or moved into the folder."""
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        super().__init__()
+        self.executor = executor
+
+    def on_created(self, event):
+        if not event.is_directory:
+            _submit(self.executor, Path(event.src_path))
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            _submit(self.executor, Path(event.dest_path))
+
+
 def main():
     print("Uploader watching for new scans…")
     SCAN_FOLDER.mkdir(parents=True, exist_ok=True)
 
-    while True:
-        files = sorted(SCAN_FOLDER.glob("*.jsonl"))
-        for file_path in files:
-            try:
-                process_file(file_path)
-            except Exception as exc:  # pylint: disable=broad-except
-                print(f"Error processing {file_path.name}: {exc}")
-        time.sleep(POLL_INTERVAL_SECONDS)
+    # Uploads are network-bound, so several files go up in parallel
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        if Observer is None:
+            while True:
+                for file_path in sorted(SCAN_FOLDER.glob("*.jsonl")):
+                    _submit(executor, file_path)
+                time.sleep(POLL_INTERVAL_SECONDS)
+
+        # inotify / ReadDirectoryChangesW: new scans go up right away
+        observer = Observer()
+        observer.schedule(_ScanFolderHandler(executor), str(SCAN_FOLDER))
+        observer.start()
+        try:
+            # Scans written while the uploader wasn't running, then a slow rescan:
+            # a file stays .jsonl until its upload succeeds, so failures are retried
+            while True:
+                for file_path in sorted(SCAN_FOLDER.glob("*.jsonl")):
+                    _submit(executor, file_path)
+                time.sleep(RESCAN_INTERVAL_SECONDS)
+        except KeyboardInterrupt:
+            observer.stop()
+            observer.join()
 
 
 if __name__ == "__main__":